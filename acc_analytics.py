@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+CHUNK_SIZE = 1_000_000
+ACC_AXES = ["x_acc", "y_acc", "z_acc"]
+
+def sample_interval(df):
+    # Median spacing in seconds; robust to the odd gap or duplicate
+    dt = df["datetime"].diff().dt.total_seconds().to_numpy()
+    dt = dt[np.isfinite(dt) & (dt > 0)]
+    return float(np.median(dt)) if len(dt) else 1.0
+
+def window_samples(df, window_s):
+    return max(1, int(round(window_s / sample_interval(df))))
+
+def magnitude(df):
+    xyz = df[ACC_AXES].to_numpy(dtype="float64")
+    return np.sqrt(np.einsum("ij,ij->i", xyz, xyz))
+
+def _chunks(n, window):
+    # Chunk bounds with window-1 samples of lead-in so rolling windows line up
+    for start in range(0, n, CHUNK_SIZE):
+        yield max(0, start - window + 1), start, min(n, start + CHUNK_SIZE)
+
+def rolling_rms(values, window):
+    values = np.asarray(values, dtype="float64")
+    out = np.full(len(values), np.nan)
+    for lead, start, stop in _chunks(len(values), window):
+        first = max(start, lead + window - 1)
+        if first >= stop:
+            continue
+        csum = np.concatenate(([0.0], np.cumsum(np.nan_to_num(values[lead:stop]) ** 2)))
+        # means[k] is the mean square of samples lead+k .. lead+k+window-1
+        means = (csum[window:] - csum[:-window]) / window
+        out[first:stop] = np.sqrt(np.clip(means[first - lead - window + 1:], 0, None))
+    return out
+
+def rolling_peak_to_peak(values, window):
+    s = pd.Series(np.asarray(values, dtype="float64"))
+    out = np.full(len(s), np.nan)
+    for lead, start, stop in _chunks(len(s), window):
+        part = s.iloc[lead:stop]
+        roll = part.rolling(window, min_periods=window)
+        out[start:stop] = (roll.max() - roll.min()).to_numpy()[start - lead:]
+    return out
+
+def add_acc_channels(df, window_s=1.0):
+    # Extra plottable channels alongside the raw g/x/y/z columns
+    df = df.copy()
+    window = window_samples(df, window_s)
+    df["acc_mag"] = magnitude(df)
+    df["acc_rms"] = rolling_rms(df["acc_mag"] - np.nanmean(df["acc_mag"]), window)
+    df["acc_p2p"] = rolling_peak_to_peak(df["acc_mag"], window)
+    return df
+
+def spectrogram(df, column="acc_mag", nperseg=256, overlap=0.5, max_frames=2000):
+    # Hann-windowed STFT power in dB; frames are strided so the output stays bounded
+    values = df[column].to_numpy(dtype="float64")
+    values = np.nan_to_num(values - np.nanmean(values))
+    if len(values) < nperseg:
+        return np.array([]), pd.DatetimeIndex([]), np.empty((0, 0))
+    step = max(1, int(nperseg * (1 - overlap)))
+    n_frames = (len(values) - nperseg) // step + 1
+    step *= max(1, int(np.ceil(n_frames / max_frames)))
+    frames = sliding_window_view(values, nperseg)[::step]
+    window = np.hanning(nperseg)
+    fs = 1.0 / sample_interval(df)
+    power = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2 / (fs * (window ** 2).sum())
+    freqs = np.fft.rfftfreq(nperseg, d=1.0 / fs)
+    times = df["datetime"].iloc[np.arange(len(frames)) * step + nperseg // 2]
+    return freqs, pd.DatetimeIndex(times), 10 * np.log10(power.T + 1e-12)
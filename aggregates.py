@@ -0,0 +1,133 @@
+import json
+import numpy as np
+import pandas as pd
+from utils import (
+    parse_staroddi_dat,
+    parse_acc_file,
+    parse_winch_dat,
+    open_raw
+)
+from catalog import connect, resolve_sensor_path
+
+RESOLUTIONS = {"minute": "min", "hour": "h"}
+SKIP_COLUMNS = ["index", "rownum", "datetime", "year", "month", "day", "hour", "minute", "second"]
+BUCKET_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def channel_columns(df):
+    return [c for c in df.select_dtypes("number").columns if c not in SKIP_COLUMNS]
+
+def minute_aggregates(df):
+    # Long-format min/max/mean/count/na_count per minute bucket and channel
+    df = df.dropna(subset=["datetime"])
+    channels = channel_columns(df)
+    grouped = df[channels].groupby(df["datetime"].dt.floor(RESOLUTIONS["minute"]))
+    stats = grouped.agg(["min", "max", "mean", "count", "size"])
+    stats.columns.names = ["channel", "stat"]
+    long = stats.stack("channel", future_stack=True).reset_index()
+    long = long.rename(columns={"datetime": "bucket"})
+    long["na_count"] = long["size"] - long["count"]
+    return long.drop(columns=["size"])
+
+def rollup(minute, resolution="hour"):
+    # Coarser buckets from minute buckets; the mean is weighted by sample count
+    bucket = minute["bucket"].dt.floor(RESOLUTIONS[resolution])
+    weighted = minute.assign(total=minute["mean"].fillna(0) * minute["count"], bucket=bucket)
+    grouped = weighted.groupby(["bucket", "channel"])
+    out = grouped.agg(min=("min", "min"), max=("max", "max"), total=("total", "sum"),
+                      count=("count", "sum"), na_count=("na_count", "sum")).reset_index()
+    out["mean"] = out["total"] / out["count"].replace(0, np.nan)
+    return out.drop(columns=["total"])
+
+def store_aggregates(conn, source, file_id, df):
+    return store_minute_aggregates(conn, source, file_id, minute_aggregates(df))
+
+def store_minute_aggregates(conn, source, file_id, minute):
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM channel_aggregates WHERE source=? AND file_id=?', (source, file_id))
+    for resolution, table in [("minute", minute), ("hour", rollup(minute, "hour"))]:
+        rows = zip(
+            [source] * len(table),
+            [file_id] * len(table),
+            [resolution] * len(table),
+            table["bucket"].dt.strftime(BUCKET_FORMAT),
+            table["channel"],
+            *(table[c].astype(object).where(table[c].notna(), None) for c in ["min", "max", "mean"]),
+            table["count"].astype(int).tolist(),
+            table["na_count"].astype(int).tolist(),
+        )
+        cursor.executemany('''
+            INSERT INTO channel_aggregates (
+                source, file_id, resolution, bucket, channel, min, max, mean, count, na_count
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+    conn.commit()
+    return len(minute)
+
+def parse_sensor_file(path, file_name):
+    parser = parse_acc_file if file_name.lower().endswith(".acc") else parse_staroddi_dat
+    with open_raw(path) as fh:
+        return parser(fh)
+
+def rebuild_all():
+    # Backfill aggregates for every cataloged file
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, file_name, file_path FROM sensor_data')
+    for file_id, file_name, file_path in cursor.fetchall():
+        df = parse_sensor_file(resolve_sensor_path(file_path, file_name), file_name)
+        print(f"sensor {file_name}: {store_aggregates(conn, 'sensor', file_id, df)} minute rows")
+    cursor.execute('SELECT id, file_name, file_path, settings FROM winch_data')
+    for file_id, file_name, file_path, settings_json in cursor.fetchall():
+        meta = json.loads(settings_json)
+        meta['file_name'] = file_name
+        meta['file_path'] = file_path
+        df = parse_winch_dat(file_name, meta)
+        print(f"winch {file_name}: {store_aggregates(conn, 'winch', file_id, df)} minute rows")
+    conn.close()
+
+def cruise_channels(cruise):
+    conn = connect()
+    channels = pd.read_sql_query('''
+        SELECT DISTINCT a.channel FROM channel_aggregates a
+        LEFT JOIN sensor_data s ON a.source = 'sensor' AND a.file_id = s.id
+        LEFT JOIN winch_data w ON a.source = 'winch' AND a.file_id = w.id
+        WHERE COALESCE(s.cruise, w.cruise) = ? AND a.resolution = 'hour'
+        ORDER BY a.channel
+    ''', conn, params=(cruise,))
+    conn.close()
+    return channels["channel"].tolist()
+
+def cruise_timeline(cruise, channel, resolution="minute"):
+    conn = connect()
+    df = pd.read_sql_query('''
+        SELECT a.bucket, MIN(a.min) AS min, MAX(a.max) AS max,
+               SUM(a.mean * a.count) / NULLIF(SUM(a.count), 0) AS mean,
+               SUM(a.count) AS count, SUM(a.na_count) AS na_count
+        FROM channel_aggregates a
+        LEFT JOIN sensor_data s ON a.source = 'sensor' AND a.file_id = s.id
+        LEFT JOIN winch_data w ON a.source = 'winch' AND a.file_id = w.id
+        WHERE COALESCE(s.cruise, w.cruise) = ? AND a.channel = ? AND a.resolution = ?
+        GROUP BY a.bucket
+        ORDER BY a.bucket
+    ''', conn, params=(cruise, channel, resolution), parse_dates=["bucket"])
+    conn.close()
+    return df
+
+def buckets_above(channel, threshold, resolution="minute", cruise=None):
+    # "Where was <channel> above X": buckets whose max exceeds the threshold
+    conn = connect()
+    df = pd.read_sql_query('''
+        SELECT a.bucket, a.max, a.source, COALESCE(s.file_name, w.file_name) AS file_name,
+               COALESCE(s.cruise, w.cruise) AS cruise, s.cast_id
+        FROM channel_aggregates a
+        LEFT JOIN sensor_data s ON a.source = 'sensor' AND a.file_id = s.id
+        LEFT JOIN winch_data w ON a.source = 'winch' AND a.file_id = w.id
+        WHERE a.channel = ? AND a.resolution = ? AND a.max > ?
+          AND (? IS NULL OR COALESCE(s.cruise, w.cruise) = ?)
+        ORDER BY a.bucket
+    ''', conn, params=(channel, resolution, threshold, cruise, cruise), parse_dates=["bucket"])
+    conn.close()
+    return df
+
+if __name__ == "__main__":
+    rebuild_all()
@@ -0,0 +1,259 @@
+import os
+import re
+import shutil
+import datetime
+import argparse
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from utils import find_raw_file
+from catalog import connect, resolve_sensor_path, winch_meta
+from time_index import iter_chunks, sensor_parser, winch_parser
+
+try:
+    import zarr
+except ImportError:
+    zarr = None
+
+try:
+    import netCDF4
+except ImportError:
+    netCDF4 = None
+
+# End-of-cruise hand-over: every cataloged DAT, ACC and winch file of a cruise streamed
+# through the parsers block by block into chunked, compressed Zarr and/or netCDF4
+# stores. Sensor files sit in one group per cast (/<cast_id>/<file>), winch files in
+# /winch/<file>; each file group has a CF time coordinate and one float64 variable per
+# numeric column, with the catalog rows as attributes. Files are archived in parallel:
+# Zarr groups are written straight into the store, netCDF files into per-file parts
+# that are copied into the cruise file chunk by chunk at the end.
+
+FORMATS = ["zarr", "netcdf"]
+CHUNK_BYTES = 32 * 1024 * 1024
+CHUNK_ROWS = 256 * 1024
+COMPLEVEL = 4
+NAT = np.iinfo(np.int64).min
+TIME_ATTRS = {"standard_name": "time", "long_name": "time", "axis": "T",
+              "units": "nanoseconds since 1970-01-01 00:00:00", "calendar": "proleptic_gregorian"}
+
+def safe_name(name):
+    return re.sub(r"[^\w.-]+", "_", str(name)).replace(".", "_")
+
+def _attr(value):
+    # netCDF and Zarr attributes take strings and numbers, not None or timestamps
+    if isinstance(value, np.generic):
+        value = value.item()
+    return "" if value is None else value if isinstance(value, (int, float, str)) else str(value)
+
+def cruise_files(cruise):
+    # One task per cataloged file of the cruise with its group path and catalog metadata
+    conn = connect()
+    sensors = pd.read_sql_query('SELECT * FROM sensor_data WHERE cruise = ? ORDER BY id', conn, params=(cruise,))
+    winches = pd.read_sql_query('SELECT * FROM winch_data WHERE cruise = ? ORDER BY id', conn, params=(cruise,))
+    dredge = pd.read_sql_query('SELECT * FROM dredge_data WHERE cruise = ?', conn, params=(cruise,))
+    conn.close()
+    tasks, casts = [], {}
+    for row in sensors.to_dict("records"):
+        if not row["file_name"].lower().endswith((".dat", ".acc")):
+            continue
+        cast = safe_name(row["cast_id"])
+        casts.setdefault(cast, {"cast_id": _attr(row["cast_id"]), "cruise": cruise})
+        tasks.append({"source": "sensor", "file_id": row["id"], "group": f"{cast}/{safe_name(row['file_name'])}",
+                      "attrs": {"source": "sensor", **{k: _attr(v) for k, v in row.items()}}})
+    for row in winches.to_dict("records"):
+        tasks.append({"source": "winch", "file_id": row["id"], "group": f"winch/{safe_name(row['file_name'])}",
+                      "attrs": {"source": "winch", **{k: _attr(v) for k, v in row.items()}}})
+    for row in dredge.to_dict("records"):
+        cast = safe_name(row["cast_id"])
+        if cast in casts:
+            casts[cast].update({f"dredge_{k}": _attr(v) for k, v in row.items() if k not in ["id", "cruise", "cast_id"]})
+    return tasks, casts
+
+def file_chunks(source, file_id, chunk_bytes=CHUNK_BYTES):
+    if source == "winch":
+        meta = winch_meta(file_id)
+        path = find_raw_file(os.path.join(meta["file_path"], meta["file_name"]))
+        return iter_chunks(path, winch_parser(meta), int(meta["header_lines"]), chunk_bytes)
+    conn = connect()
+    file_name, file_path = conn.execute('SELECT file_name, file_path FROM sensor_data WHERE id=?', (file_id,)).fetchone()
+    conn.close()
+    path = find_raw_file(resolve_sensor_path(file_path, file_name))
+    return iter_chunks(path, sensor_parser(file_name), 0, chunk_bytes)
+
+def columns_of(df):
+    # Numeric columns become variables; the first chunk fixes the set for the whole file
+    return [c for c in df.columns if c != "datetime" and pd.api.types.is_numeric_dtype(df[c])]
+
+def chunk_arrays(df, columns):
+    times = pd.to_datetime(df["datetime"], errors="coerce").astype("datetime64[ns]").to_numpy().view(np.int64)
+    values = {c: pd.to_numeric(df[c], errors="coerce").to_numpy(dtype="float64") if c in df.columns
+              else np.full(len(df), np.nan) for c in columns}
+    return times, values
+
+def _coverage(first, last):
+    return {"time_coverage_start": str(pd.Timestamp(first)) if first is not None else "",
+            "time_coverage_end": str(pd.Timestamp(last)) if last is not None else ""}
+
+def _time_bounds(times, first, last):
+    filled = times[times != NAT]
+    if len(filled):
+        first = filled.min() if first is None else min(first, filled.min())
+        last = filled.max() if last is None else max(last, filled.max())
+    return first, last
+
+def write_zarr(task, path, chunk_bytes=CHUNK_BYTES):
+    # Appends every chunk of one file to its group of the cruise store
+    group = zarr.open_group(path, mode="r+").require_group(task["group"])
+    compressors = zarr.codecs.BloscCodec(cname="zstd", clevel=COMPLEVEL, shuffle="shuffle")
+    arrays, n, first, last = None, 0, None, None
+    for df in file_chunks(task["source"], task["file_id"], chunk_bytes):
+        if arrays is None:
+            columns = columns_of(df)
+            arrays = {"time": group.create_array("time", shape=(0,), chunks=(CHUNK_ROWS,), dtype="int64",
+                                                 fill_value=NAT, compressors=compressors, dimension_names=["time"],
+                                                 overwrite=True)}
+            arrays["time"].attrs.update(TIME_ATTRS)
+            for c in columns:
+                arrays[c] = group.create_array(safe_name(c), shape=(0,), chunks=(CHUNK_ROWS,), dtype="float64",
+                                               fill_value=np.nan, compressors=compressors, dimension_names=["time"],
+                                               overwrite=True)
+                arrays[c].attrs.update({"long_name": str(c)})
+        times, values = chunk_arrays(df, columns)
+        arrays["time"].append(times)
+        for c in columns:
+            arrays[c].append(values[c])
+        n += len(times)
+        first, last = _time_bounds(times, first, last)
+    group.attrs.update({**task["attrs"], "rows": n, **_coverage(first, last)})
+    return n
+
+def write_netcdf_part(task, path, chunk_bytes=CHUNK_BYTES):
+    # One file into its own netCDF file; merged into the cruise file afterwards
+    n, first, last = 0, None, None
+    with netCDF4.Dataset(path, "w", format="NETCDF4") as ds:
+        ds.createDimension("time", None)
+        variables = None
+        for df in file_chunks(task["source"], task["file_id"], chunk_bytes):
+            if variables is None:
+                columns = columns_of(df)
+                variables = {"time": ds.createVariable("time", "i8", ("time",), zlib=True, complevel=COMPLEVEL,
+                                                       chunksizes=(CHUNK_ROWS,), fill_value=NAT)}
+                variables["time"].setncatts(TIME_ATTRS)
+                for c in columns:
+                    variables[c] = ds.createVariable(safe_name(c), "f8", ("time",), zlib=True, complevel=COMPLEVEL,
+                                                     chunksizes=(CHUNK_ROWS,), fill_value=np.nan)
+                    variables[c].long_name = str(c)
+            times, values = chunk_arrays(df, columns)
+            variables["time"][n:n + len(times)] = times
+            for c in columns:
+                variables[c][n:n + len(times)] = values[c]
+            n += len(times)
+            first, last = _time_bounds(times, first, last)
+        ds.setncatts({**task["attrs"], "rows": n, **_coverage(first, last)})
+    return n
+
+def merge_netcdf(parts, casts, attrs, path):
+    # Copy each part into its group of the cruise file, CHUNK_ROWS at a time
+    tmp = path + ".tmp"
+    with netCDF4.Dataset(tmp, "w", format="NETCDF4") as out:
+        out.setncatts(attrs)
+        for name, cast_attrs in casts.items():
+            out.createGroup(name).setncatts(cast_attrs)
+        for group_path, part in parts:
+            group = out.createGroup(group_path)
+            with netCDF4.Dataset(part) as src:
+                src.set_auto_maskandscale(False)
+                group.setncatts({k: src.getncattr(k) for k in src.ncattrs()})
+                group.createDimension("time", None)
+                n = len(src.dimensions["time"])
+                for name, var in src.variables.items():
+                    filters = var.filters()
+                    dst = group.createVariable(name, var.dtype, ("time",), zlib=True, complevel=filters["complevel"],
+                                               chunksizes=var.chunking(), fill_value=var.getncattr("_FillValue"))
+                    dst.setncatts({k: var.getncattr(k) for k in var.ncattrs() if k != "_FillValue"})
+                    for start in range(0, n, CHUNK_ROWS):
+                        stop = min(start + CHUNK_ROWS, n)
+                        dst[start:stop] = var[start:stop]
+    os.replace(tmp, path)
+
+def archive_file(task, fmt, path, chunk_bytes=CHUNK_BYTES):
+    # Runs in a worker process; returns (group, rows, error)
+    try:
+        write = write_zarr if fmt == "zarr" else write_netcdf_part
+        return task["group"], write(task, path, chunk_bytes), None
+    except Exception as e:
+        traceback.print_exc()
+        return task["group"], 0, f"{type(e).__name__}: {e}"
+
+def archive_cruise(cruise, out_dir="archive", formats=("zarr",), workers=None, chunk_bytes=CHUNK_BYTES, report=None):
+    # Returns {format: {"path", "rows" by group, "errors" by group}}
+    if "zarr" in formats and zarr is None:
+        raise RuntimeError("Zarr archives need the zarr package (`pip install zarr`)")
+    if "netcdf" in formats and netCDF4 is None:
+        raise RuntimeError("netCDF archives need the netCDF4 package (`pip install netCDF4`)")
+    tasks, casts = cruise_files(cruise)
+    if not tasks:
+        raise ValueError(f"No cataloged files for cruise {cruise}")
+    os.makedirs(out_dir, exist_ok=True)
+    attrs = {"Conventions": "CF-1.8", "title": f"Dredge sensor and winch data, cruise {cruise}", "cruise": cruise,
+             "source": "dredge_remote.db catalog", "files": len(tasks),
+             "history": f"{datetime.datetime.now().isoformat(timespec='seconds')} archive.py"}
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    results = {}
+    for i, fmt in enumerate(formats):
+        name = safe_name(cruise)
+        if fmt == "zarr":
+            path = os.path.join(out_dir, f"{name}.zarr")
+            root = zarr.open_group(path, mode="w")
+            root.attrs.update(attrs)
+            for cast, cast_attrs in casts.items():
+                root.require_group(cast).attrs.update(cast_attrs)
+            if any(t["source"] == "winch" for t in tasks):
+                root.require_group("winch")
+            targets = [path] * len(tasks)
+        else:
+            path = os.path.join(out_dir, f"{name}.nc")
+            part_dir = path + ".parts"
+            os.makedirs(part_dir, exist_ok=True)
+            targets = [os.path.join(part_dir, f"{t['source']}_{t['file_id']}.nc") for t in tasks]
+        rows, errors = {}, {}
+        if workers == 1:
+            done = (archive_file(t, fmt, target, chunk_bytes) for t, target in zip(tasks, targets))
+            pool = None
+        else:
+            # spawn: the archive job runs on a thread of the Streamlit server
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            done = pool.map(archive_file, tasks, [fmt] * len(tasks), targets, [chunk_bytes] * len(tasks))
+        try:
+            for k, (group, n, error) in enumerate(done, start=1):
+                if error:
+                    errors[group] = error
+                else:
+                    rows[group] = n
+                if report:
+                    report((i + k / len(tasks)) / len(formats), f"{fmt}: {k}/{len(tasks)} files")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        if fmt == "netcdf":
+            parts = [(t["group"], target) for t, target in zip(tasks, targets) if t["group"] in rows]
+            merge_netcdf(parts, casts, attrs, path)
+            shutil.rmtree(part_dir)
+        results[fmt] = {"path": path, "rows": rows, "errors": errors}
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive a cruise's sensor and winch data to Zarr/netCDF")
+    parser.add_argument("cruise")
+    parser.add_argument("--out", default="archive", help="Output directory")
+    parser.add_argument("--formats", nargs="+", default=["zarr"], choices=FORMATS)
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    parser.add_argument("--chunk-mb", type=int, default=CHUNK_BYTES // 1024 ** 2, help="Raw bytes parsed per chunk")
+    args = parser.parse_args()
+    result = archive_cruise(args.cruise, args.out, args.formats, args.workers, args.chunk_mb * 1024 ** 2)
+    for fmt, r in result.items():
+        print(f"{fmt}: {r['path']}, {len(r['rows'])} file(s), {sum(r['rows'].values())} rows")
+        for group, error in r["errors"].items():
+            print(f"  {group}: {error}")
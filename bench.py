@@ -0,0 +1,196 @@
+import os
+import sys
+import subprocess
+import time
+import tempfile
+import datetime
+import numpy as np
+import pandas as pd
+from utils import (
+    parse_acc_file,
+    parse_winch_dat,
+    parse_staroddi_times,
+    decode_staroddi_times,
+    open_raw,
+    save_raw,
+    COMPRESSIONS
+)
+from parser_backends import read_table, available_backends
+from time_index import build_index, parse_window, sensor_parser, winch_parser
+
+ACC_HEADER = "#0\tDate & Time:\t09.08.2022 12:00:00\n#1\tChannels:\t4\n"
+WINCH_COLUMNS = ["year", "month", "day", "hour", "minute", "second", "Winch", "Winch Mode",
+                 "Wire_out", "Calc Tension", "Velocity", "Alarm", "Block Length", "Tension"]
+
+def make_acc_file(path, n_rows, interval_ms=40):
+    # Synthetic Star-Oddi .ACC log with decimal commas and dd.mm.yyyy timestamps
+    start = datetime.datetime(2022, 8, 9, 12, 0, 0)
+    rng = np.random.default_rng(0)
+    acc = rng.normal(0, 0.2, size=(n_rows, 3)) + [0, 0, 1]
+    with open(path, "w", encoding="latin1") as f:
+        f.write(ACC_HEADER)
+        for i in range(n_rows):
+            t = start + datetime.timedelta(milliseconds=i * interval_ms)
+            ts = t.strftime("%d.%m.%Y %H:%M:%S,") + f"{t.microsecond // 1000:03d}"
+            x, y, z = acc[i]
+            g = (x * x + y * y + z * z) ** 0.5
+            f.write(f"{i + 1}\t{ts}\t{g:.3f}\t{x:.3f}\t{y:.3f}\t{z:.3f}\n".replace(".", ","))
+    return path
+
+def make_winch_file(path, n_rows, interval_ms=200):
+    # Synthetic whitespace-delimited winch log matching winch/*.meta.json
+    start = datetime.datetime(2022, 8, 9, 0, 0, 0)
+    rng = np.random.default_rng(0)
+    wire = np.cumsum(rng.normal(0, 0.5, n_rows)).clip(0)
+    tension = 2 + rng.normal(0, 0.3, n_rows)
+    with open(path, "w") as f:
+        for i in range(n_rows):
+            t = start + datetime.timedelta(milliseconds=i * interval_ms)
+            sec = t.second + t.microsecond / 1e6
+            f.write(f"{t.year} {t.month} {t.day} {t.hour} {t.minute} {sec:.3f} 1 2 "
+                    f"{wire[i]:.1f} {tension[i]:.2f} 0.0 0 0.0 {tension[i]:.2f}\n")
+    return path
+
+def winch_meta(path):
+    return {
+        "file_path": os.path.dirname(path),
+        "file_name": os.path.basename(path),
+        "delimiter": r"\s+",
+        "header_lines": 0,
+        "columns": WINCH_COLUMNS,
+    }
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def bench_compression(n_rows=500_000):
+    # Parse time and on-disk size of raw files stored plain vs compressed
+    with tempfile.TemporaryDirectory() as tmp:
+        acc_src = make_acc_file(os.path.join(tmp, "src.acc"), n_rows)
+        winch_src = make_winch_file(os.path.join(tmp, "src.dat"), n_rows)
+        print(f"{'file':<8}{'storage':<8}{'size MB':>10}{'ratio':>8}{'parse s':>10}")
+        for kind, src in [("acc", acc_src), ("winch", winch_src)]:
+            plain_size = os.path.getsize(src)
+            for compression in COMPRESSIONS:
+                with open(src, "rb") as fh:
+                    path = save_raw(fh, os.path.join(tmp, f"{compression}.{kind}"), compression)
+                size = os.path.getsize(path)
+                if kind == "acc":
+                    def run():
+                        with open_raw(path) as fh:
+                            parse_acc_file(fh)
+                else:
+                    meta = winch_meta(path)
+                    meta["file_name"] = f"{compression}.{kind}"
+                    def run():
+                        parse_winch_dat(meta["file_name"], meta)
+                print(f"{kind:<8}{compression:<8}{size / 1e6:>10.2f}{plain_size / size:>8.1f}{timed(run):>10.3f}")
+
+PAGE_MODULES = ["plot_wso", "compare_casts", "cruise_overview", "w_import", "so_import"]
+
+def cold_import_time(statement, repeat=3):
+    # Fresh interpreter per run so nothing is already in sys.modules
+    here = os.path.dirname(os.path.abspath(__file__))
+    return timed(lambda: subprocess.run([sys.executable, "-c", statement], cwd=here, check=True), repeat)
+
+def extra_modules(name):
+    # Modules a page pulls in beyond what streamlit itself already loads
+    code = (f"import sys, streamlit; base = set(sys.modules); import {name}; "
+            "print(len(set(sys.modules) - base))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                         capture_output=True, text=True, check=True)
+    return int(out.stdout.strip())
+
+def bench_imports():
+    # Cold import cost per page vs importing every page up front as the app used to
+    baseline = cold_import_time("import streamlit")
+    print(f"{'module':<18}{'import s':>10}{'over streamlit':>16}{'extra modules':>15}")
+    for name in PAGE_MODULES:
+        t = cold_import_time(f"import streamlit, {name}")
+        print(f"{name:<18}{t:>10.3f}{t - baseline:>16.3f}{extra_modules(name):>15}")
+    t = cold_import_time("import streamlit, " + ", ".join(PAGE_MODULES))
+    print(f"{'all pages':<18}{t:>10.3f}{t - baseline:>16.3f}{extra_modules(', '.join(PAGE_MODULES)):>15}")
+
+def bench_winch_backends(n_rows=2_000_000):
+    # Each backend must match the pandas reference frame; speedup is vs pandas
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_winch_file(os.path.join(tmp, "winch.dat"), n_rows)
+        meta = winch_meta(path)
+        opener = lambda: open_raw(path)
+        reference = read_table(opener, meta["delimiter"], 0, meta["columns"], "pandas")
+        base = None
+        print(f"{os.cpu_count()} CPU(s), {n_rows} rows")
+        print(f"{'backend':<10}{'parse s':>10}{'speedup':>10}{'matches':>10}")
+        for name in available_backends()[::-1]:
+            run = lambda: read_table(opener, meta["delimiter"], 0, meta["columns"], name)
+            t = timed(run)
+            base = base or t
+            try:
+                pd.testing.assert_frame_equal(run(), reference)
+                matches = "yes"
+            except AssertionError:
+                matches = "NO"
+            print(f"{name:<10}{t:>10.3f}{base / t:>10.2f}{matches:>10}")
+
+def bench_window_read(n_rows=2_000_000, window_s=600):
+    # Short-window reads: full parse + mask vs sparse byte-offset index
+    with tempfile.TemporaryDirectory() as tmp:
+        acc_path = make_acc_file(os.path.join(tmp, "big.acc"), n_rows)
+        winch_path = make_winch_file(os.path.join(tmp, "big.dat"), n_rows)
+        print(f"{'file':<8}{'index build s':>15}{'full parse s':>14}{'window s':>10}{'rows':>8}")
+        for kind, path, parse_bytes, first_line in [
+            ("acc", acc_path, sensor_parser("big.acc"), ACC_HEADER.count("\n")),
+            ("winch", winch_path, winch_parser(winch_meta(winch_path)), 0),
+        ]:
+            t0 = time.perf_counter()
+            offsets, times, size = build_index(path, parse_bytes, first_line)
+            build_s = time.perf_counter() - t0
+            start = pd.Timestamp(times[len(times) // 2])
+            end = start + pd.Timedelta(seconds=window_s)
+            def parse_full():
+                with open(path, "rb") as fh:
+                    return parse_bytes(fh.read())
+            full = parse_full()
+            full_s = timed(parse_full, repeat=1)
+            window = parse_window(path, parse_bytes, offsets, times, size, start, end)
+            expected = full[(full["datetime"] >= start) & (full["datetime"] <= end)].reset_index(drop=True)
+            pd.testing.assert_frame_equal(window, expected)
+            window_s_taken = timed(lambda: parse_window(path, parse_bytes, offsets, times, size, start, end))
+            print(f"{kind:<8}{build_s:>15.3f}{full_s:>14.3f}{window_s_taken:>10.4f}{len(window):>8}")
+
+def bench_staroddi_times(n_rows=2_000_000, malformed=0.001):
+    # Timestamp column of an ACC file: format-based parse vs fixed-width byte decoder,
+    # with a sprinkling of malformed rows to exercise the fallback
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_acc_file(os.path.join(tmp, "big.acc"), n_rows)
+        with open(path, "rb") as fh:
+            times = pd.read_csv(fh, sep="\t", skiprows=ACC_HEADER.count("\n"), header=None, usecols=[1])[1]
+    bad = np.random.default_rng(0).choice(n_rows, int(n_rows * malformed), replace=False)
+    times = times.astype(object)
+    for i, value in enumerate(["31.02.2022 12:00:00,000", "09.08.2022 12:00:00,04", "____", None]):
+        times.iloc[bad[i::4]] = value
+    print(f"{'column':<10}{'generic s':>11}{'decoder s':>11}{'speedup':>9}")
+    for name, column in [("str", times.astype("str")), ("object", times)]:
+        pd.testing.assert_series_equal(decode_staroddi_times(column), parse_staroddi_times(column))
+        generic_s = timed(lambda: parse_staroddi_times(column), repeat=1)
+        decoder_s = timed(lambda: decode_staroddi_times(column))
+        print(f"{name:<10}{generic_s:>11.3f}{decoder_s:>11.3f}{generic_s / decoder_s:>8.1f}x")
+
+BENCHMARKS = {
+    "compression": bench_compression,
+    "staroddi_times": bench_staroddi_times,
+    "imports": bench_imports,
+    "winch_backends": bench_winch_backends,
+    "window_read": bench_window_read,
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"== {name}")
+        BENCHMARKS[name]()
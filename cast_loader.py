@@ -0,0 +1,78 @@
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from utils import find_raw_file, get_time_range
+from catalog import overlapping_winch
+from datasets import load_sensor, load_acc_channels, load_winch
+
+# Loads every source of a cast at once: the DAT, ACC and overlapping winch parses are
+# mostly file I/O and pandas C code, so on a thread pool the wait is roughly the
+# slowest file instead of the sum. Files above PROCESS_BYTES are parsed in a process
+# pool so their Python-level string handling does not hold the GIL.
+
+MAX_WORKERS = 8
+PROCESS_WORKERS = min(4, os.cpu_count() or 1)
+PROCESS_BYTES = 256 * 1024 * 1024
+
+_process_pool = None
+_process_lock = threading.Lock()
+
+def _get_process_pool():
+    global _process_pool
+    with _process_lock:
+        if _process_pool is None:
+            # spawn: forking a threaded server process is unsafe
+            _process_pool = ProcessPoolExecutor(max_workers=PROCESS_WORKERS,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        return _process_pool
+
+def _executor_for(path, use_processes):
+    if use_processes and os.path.getsize(find_raw_file(path)) >= PROCESS_BYTES:
+        return _get_process_pool()
+    return None
+
+def load_cast_bundle(dat_path=None, acc_path=None, acc_window_s=None, time_range=None, use_processes=True):
+    # time_range: the DAT record's (start, end) from the catalog, so overlapping winch
+    # files are known before parsing; without it winch loads wait for the DAT parse.
+    # acc_window_s adds the rolling ACC channels. Returns a dict with the frames,
+    # winch frames and settings by file name, per-source load times and the slowest source.
+    t0 = time.perf_counter()
+    timings = {}
+
+    def timed(source, fn, *args):
+        def run():
+            start = time.perf_counter()
+            value = fn(*args)
+            timings[source] = time.perf_counter() - start
+            return value
+        return run
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = {}
+        if dat_path:
+            futures["dat"] = pool.submit(timed("dat", load_sensor, dat_path, "dat", _executor_for(dat_path, use_processes)))
+        if acc_path:
+            executor = _executor_for(acc_path, use_processes)
+            if acc_window_s is None:
+                futures["acc"] = pool.submit(timed("acc", load_sensor, acc_path, "acc", executor))
+            else:
+                futures["acc"] = pool.submit(timed("acc", load_acc_channels, acc_path, acc_window_s, executor))
+        if time_range is None and "dat" in futures:
+            time_range = get_time_range(futures["dat"].result())
+        winch_meta = overlapping_winch(*time_range) if time_range else {}
+        for file_name, meta in winch_meta.items():
+            path = os.path.join(meta["file_path"], meta["file_name"])
+            futures[file_name] = pool.submit(timed(file_name, load_winch, meta, _executor_for(path, use_processes)))
+        results = {source: future.result() for source, future in futures.items()}
+
+    return {
+        "dat": results.get("dat"),
+        "acc": results.get("acc"),
+        "winch": {file_name: results[file_name] for file_name in winch_meta},
+        "winch_meta": winch_meta,
+        "timings": timings,
+        "slowest": max(timings.items(), key=lambda item: item[1]) if timings else None,
+        "load_s": time.perf_counter() - t0,
+    }
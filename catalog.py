@@ -0,0 +1,134 @@
+import os
+import json
+import sqlite3
+import datetime
+import pandas as pd
+from utils import find_raw_file
+import dataset_cache
+
+DB_PATH = "dredge_remote.db"
+SENSOR_DIR = "sensor_data"
+
+def connect():
+    return sqlite3.connect(DB_PATH)
+
+def list_cast_ids():
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT DISTINCT cast_id FROM sensor_data')
+    cast_ids = [row[0] for row in cursor.fetchall()]
+    conn.close()
+    return cast_ids
+
+def cast_files(cast_id):
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT file_name, file_path FROM sensor_data WHERE cast_id=?', (cast_id,))
+    files = cursor.fetchall()
+    conn.close()
+    return files
+
+def sensor_file_id(cast_id, file_name):
+    # Catalog id of a cast's file; logger default names repeat across casts
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT MAX(id) FROM sensor_data WHERE cast_id=? AND file_name=?', (cast_id, file_name))
+    row = cursor.fetchone()
+    conn.close()
+    return row[0] if row else None
+
+def recorded_time_range(cast_id, file_name):
+    # Start/end written at ingest, or None for files ingested before times were recorded
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT start_time, end_time FROM sensor_data WHERE cast_id=? AND file_name=?', (cast_id, file_name))
+    row = cursor.fetchone()
+    conn.close()
+    if row is None or not row[0] or not row[1]:
+        return None
+    start, end = pd.to_datetime(row[0], errors="coerce"), pd.to_datetime(row[1], errors="coerce")
+    return None if pd.isna(start) or pd.isna(end) else (start, end)
+
+def resolve_sensor_path(file_path, file_name):
+    # file_path is either a directory or the saved/registered path itself; fall back to sensor_data/
+    if os.path.isdir(file_path):
+        full_path = os.path.join(file_path, file_name)
+    elif file_path and os.path.isfile(find_raw_file(file_path)):
+        full_path = file_path
+    else:
+        full_path = os.path.join(SENSOR_DIR, file_name)
+    if not os.path.isfile(find_raw_file(full_path)):
+        full_path = os.path.join(SENSOR_DIR, file_name)
+    return full_path
+
+def overlapping_winch(min_dt, max_dt):
+    # Winch metadata (settings merged with file_name/file_path) overlapping [min_dt, max_dt]
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT file_name, file_path, start_time, end_time, settings FROM winch_data')
+    winch_rows = cursor.fetchall()
+    conn.close()
+
+    meta_dict = {}
+    for file_name, file_path, start_time, end_time, settings_json in winch_rows:
+        try:
+            winch_start = pd.to_datetime(start_time)
+            winch_end = pd.to_datetime(end_time)
+            if (winch_start <= max_dt) and (winch_end >= min_dt):
+                meta = json.loads(settings_json)
+                meta['file_name'] = file_name
+                meta['file_path'] = file_path
+                meta_dict[file_name] = meta
+        except Exception:
+            continue
+    return meta_dict
+
+def winch_meta(file_id):
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT file_name, file_path, settings FROM winch_data WHERE id=?', (file_id,))
+    file_name, file_path, settings_json = cursor.fetchone()
+    conn.close()
+    meta = json.loads(settings_json)
+    meta['file_name'] = file_name
+    meta['file_path'] = file_path
+    return meta
+
+def sensor_file(file_id):
+    # (file_name, resolved path) for a sensor_data row
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT file_name, file_path FROM sensor_data WHERE id=?', (file_id,))
+    file_name, file_path = cursor.fetchone()
+    conn.close()
+    return file_name, resolve_sensor_path(file_path, file_name)
+
+def existing_path(path):
+    # Absolute path of a file to register in place; raises ValueError if it is not readable
+    path = os.path.abspath(os.path.expanduser(path.strip()))
+    if not os.path.isfile(path):
+        raise ValueError(f"No such file: {path}")
+    if not os.access(path, os.R_OK):
+        raise ValueError(f"File is not readable by the server: {path}")
+    return path
+
+def registered_file(source, path):
+    # file_id of a catalog row already pointing at path, if any
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT file_id FROM file_stats WHERE source=? AND path=?', (source, path))
+    row = cursor.fetchone()
+    conn.close()
+    return row[0] if row else None
+
+def record_file_stats(conn, source, file_id, path, in_place):
+    # Size, mtime and content fingerprint of a cataloged file, to detect later changes
+    raw = os.path.abspath(find_raw_file(path))
+    stat = os.stat(raw)
+    conn.execute('DELETE FROM file_stats WHERE source=? AND file_id=?', (source, file_id))
+    conn.execute('''
+        INSERT INTO file_stats (source, file_id, path, file_size, mtime, content_hash, in_place, recorded_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (source, file_id, raw, stat.st_size, stat.st_mtime, dataset_cache.file_hash(raw), int(in_place),
+          datetime.datetime.now().isoformat(timespec="seconds")))
+    conn.commit()
@@ -0,0 +1,112 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+import streamlit as st
+from utils import find_raw_file, bottom_mask
+from datasets import load_sensor, load_winch, winch_settings_key
+from figures import decimate
+import dataset_cache
+from catalog import list_cast_ids, cast_files, resolve_sensor_path, overlapping_winch
+
+N_POINTS = 2000
+MAX_WORKERS = 8
+ALIGNMENTS = ["Cast start", "Bottom arrival"]
+
+def sensor_summary(path, kind, n_points=N_POINTS):
+    def build():
+        df = load_sensor(path, kind).dropna(subset=["datetime"])
+        summary = {"df": decimate(df, n_points), "start": df["datetime"].min(), "end": df["datetime"].max(), "bottom": None}
+        if kind == "dat" and df["press"].notna().any():
+            # Bottom arrival: first sample on bottom
+            summary["bottom"] = df.loc[bottom_mask(df["press"]).idxmax(), "datetime"]
+        return summary
+    key = (dataset_cache.file_hash(find_raw_file(path)), "summary", kind, n_points)
+    return dataset_cache.get_or_load(key, build)
+
+def winch_summary(meta):
+    # Winch day files are reduced to 1 s means once; casts slice from that
+    def build():
+        df = load_winch(meta)
+        numeric = df.drop(columns=["datetime"]).select_dtypes("number")
+        return numeric.groupby(df["datetime"].dt.floor("s")).mean().rename_axis("datetime").reset_index()
+    path = find_raw_file(os.path.join(meta["file_path"], meta["file_name"]))
+    key = (dataset_cache.file_hash(path), "winch_1s", winch_settings_key(meta))
+    return dataset_cache.get_or_load(key, build)
+
+def load_cast(cast_id, n_points=N_POINTS):
+    t0 = time.perf_counter()
+    cast = {"cast_id": cast_id, "dat": None, "acc": None, "winch": None}
+    for file_name, file_path in cast_files(cast_id):
+        kind = os.path.splitext(file_name)[1].lower().lstrip(".")
+        if kind in ("dat", "acc") and cast[kind] is None:
+            cast[kind] = sensor_summary(resolve_sensor_path(file_path, file_name), kind, n_points)
+    ref = cast["dat"] or cast["acc"]
+    if ref is not None:
+        cast["start"], cast["end"], cast["bottom"] = ref["start"], ref["end"], ref["bottom"]
+        winch_parts = []
+        for meta in overlapping_winch(ref["start"], ref["end"]).values():
+            winch = winch_summary(meta)
+            winch_parts.append(winch[(winch["datetime"] >= ref["start"]) & (winch["datetime"] <= ref["end"])])
+        if winch_parts:
+            cast["winch"] = {"df": decimate(pd.concat(winch_parts, ignore_index=True), n_points)}
+    cast["load_s"] = time.perf_counter() - t0
+    return cast
+
+def load_casts(cast_ids, n_points=N_POINTS):
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, max(1, len(cast_ids)))) as pool:
+        return list(pool.map(lambda c: load_cast(c, n_points), cast_ids))
+
+def reference_time(cast, alignment):
+    if alignment == "Bottom arrival" and cast.get("bottom") is not None:
+        return cast["bottom"]
+    return cast.get("start")
+
+def compare_casts():
+    st.title("Compare Casts")
+
+    cast_ids = list_cast_ids()
+    selected = st.multiselect("Select casts to overlay", cast_ids, default=cast_ids[:3])
+    alignment = st.radio("Align casts on", ALIGNMENTS, horizontal=True)
+    n_points = st.number_input("Points per cast and source", min_value=200, max_value=20000, value=N_POINTS, step=200)
+    if not selected:
+        st.info("Select one or more casts.")
+        return
+
+    t0 = time.perf_counter()
+    casts = [c for c in load_casts(selected, int(n_points)) if c.get("start") is not None]
+    st.caption(f"Loaded {len(casts)} cast(s) in {time.perf_counter() - t0:.2f} s")
+    if not casts:
+        st.warning("None of the selected casts have DAT or ACC files.")
+        return
+
+    sources = []
+    for kind, label, skip in [("dat", "Main data", ["index", "datetime"]),
+                              ("acc", "ACC data", ["rownum", "datetime"]),
+                              ("winch", "Winch data", ["datetime"])]:
+        frames = [c[kind]["df"] for c in casts if c[kind] is not None]
+        if frames:
+            options = [col for col in frames[0].columns if col not in skip]
+            sources.append((kind, label, st.selectbox(f"{label} channel", options, key=f"compare_{kind}")))
+
+    fig = make_subplots(rows=len(sources), cols=1, shared_xaxes=True, vertical_spacing=0.05,
+                        subplot_titles=tuple(f"{label}: {col}" for _, label, col in sources))
+    for row, (kind, label, col) in enumerate(sources, start=1):
+        for cast in casts:
+            if cast[kind] is None or col not in cast[kind]["df"].columns:
+                continue
+            df = cast[kind]["df"]
+            minutes = (df["datetime"] - reference_time(cast, alignment)).dt.total_seconds() / 60
+            fig.add_trace(go.Scattergl(x=minutes, y=df[col], mode="lines", name=str(cast["cast_id"]),
+                                       legendgroup=str(cast["cast_id"]), showlegend=row == 1),
+                          row=row, col=1)
+        if col == "press":
+            fig.update_yaxes(autorange="reversed", row=row, col=1)
+    fig.update_xaxes(title_text=f"Minutes from {alignment.lower()}", row=len(sources), col=1)
+    fig.update_layout(height=300 * len(sources) + 100, template="plotly_white", hovermode="x unified")
+    st.plotly_chart(fig, use_container_width=True)
+
+    slowest = max(casts, key=lambda c: c["load_s"])
+    st.caption(f"Slowest cast: {slowest['cast_id']} ({slowest['load_s']:.2f} s)")
@@ -42,5 +42,98 @@ CREATE TABLE IF NOT EXISTS sensor_data (
 )
 ''')
 
+cursor.execute('''
+CREATE TABLE IF NOT EXISTS channel_aggregates (
+    source TEXT,
+    file_id INTEGER,
+    resolution TEXT,
+    bucket TEXT,
+    channel TEXT,
+    min REAL,
+    max REAL,
+    mean REAL,
+    count INTEGER,
+    na_count INTEGER
+)
+''')
+
+cursor.execute('''
+CREATE INDEX IF NOT EXISTS idx_aggregates_file
+ON channel_aggregates (source, file_id, resolution, bucket)
+''')
+
+cursor.execute('''
+CREATE INDEX IF NOT EXISTS idx_aggregates_channel
+ON channel_aggregates (channel, resolution, bucket)
+''')
+
+cursor.execute('''
+CREATE TABLE IF NOT EXISTS ingest_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT,
+    params TEXT,
+    parent_id INTEGER,
+    status TEXT,
+    progress REAL,
+    message TEXT,
+    created_at TEXT,
+    updated_at TEXT
+)
+''')
+
+cursor.execute('''
+CREATE TABLE IF NOT EXISTS qc_summary (
+    source TEXT,
+    file_id INTEGER,
+    n_samples INTEGER,
+    n_flagged INTEGER,
+    summary TEXT,
+    created_at TEXT
+)
+''')
+
+cursor.execute('''
+CREATE TABLE IF NOT EXISTS time_index (
+    source TEXT,
+    file_id INTEGER,
+    every INTEGER,
+    file_size INTEGER,
+    mtime REAL,
+    monotonic INTEGER,
+    offsets BLOB,
+    times BLOB
+)
+''')
+
+cursor.execute('''
+CREATE TABLE IF NOT EXISTS cast_summary (
+    cast_id TEXT PRIMARY KEY,
+    cruise TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    duration_min REAL,
+    max_depth REAL,
+    time_on_bottom_min REAL,
+    max_tension REAL,
+    max_wire_out REAL,
+    peak_acc REAL,
+    error TEXT,
+    computed_at TEXT
+)
+''')
+
+cursor.execute('''
+CREATE TABLE IF NOT EXISTS file_stats (
+    source TEXT,
+    file_id INTEGER,
+    path TEXT,
+    file_size INTEGER,
+    mtime REAL,
+    content_hash TEXT,
+    in_place INTEGER,
+    recorded_at TEXT
+)
+''')
+
 conn.commit()
 conn.close()
\ No newline at end of file
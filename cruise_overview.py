@@ -0,0 +1,46 @@
+import plotly.graph_objects as go
+import streamlit as st
+from catalog import connect
+from aggregates import cruise_channels, cruise_timeline, buckets_above
+from archive import FORMATS
+from jobs import submit, job_panel
+
+def cruise_overview():
+    st.title("Cruise Overview")
+
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT cruise FROM winch_data UNION SELECT cruise FROM sensor_data')
+    cruises = sorted(row[0] for row in cursor.fetchall() if row[0])
+    conn.close()
+    if not cruises:
+        st.info("No cruises in the database yet.")
+        return
+
+    cruise = st.selectbox("Cruise", cruises)
+    with st.expander("Archive cruise", expanded=False):
+        formats = st.multiselect("Formats", FORMATS, default=["zarr"])
+        if st.button("Write archive", disabled=not formats):
+            job_id = submit("archive", {"cruise": cruise, "formats": formats})
+            st.success(f"Archive job #{job_id} queued; output goes to archive/.")
+        job_panel()
+    channels = cruise_channels(cruise)
+    if not channels:
+        st.warning("No aggregates stored for this cruise. Run `python aggregates.py` to backfill.")
+        return
+    channel = st.selectbox("Channel", channels, index=channels.index("Tension") if "Tension" in channels else 0)
+    resolution = st.radio("Resolution", ["hour", "minute"], horizontal=True)
+
+    timeline = cruise_timeline(cruise, channel, resolution)
+    fig = go.Figure([
+        go.Scatter(x=timeline["bucket"], y=timeline["max"], mode="lines", line=dict(width=0), showlegend=False),
+        go.Scatter(x=timeline["bucket"], y=timeline["min"], mode="lines", line=dict(width=0), fill="tonexty",
+                   name="min/max"),
+        go.Scatter(x=timeline["bucket"], y=timeline["mean"], mode="lines", name="mean"),
+    ])
+    fig.update_layout(title=f"{cruise}: {channel} per {resolution}", height=450, template="plotly_white")
+    st.plotly_chart(fig, use_container_width=True)
+
+    threshold = st.number_input(f"Show {resolution}s where {channel} exceeded", value=float(timeline["max"].quantile(0.99)))
+    above = buckets_above(channel, threshold, resolution, cruise)
+    st.write(f"{len(above)} {resolution}(s) above {threshold}", above)
@@ -0,0 +1,128 @@
+import os
+import argparse
+import datetime
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from utils import bottom_mask
+from catalog import connect, cast_files, resolve_sensor_path, overlapping_winch
+from datasets import load_sensor, load_winch, sensor_kind
+from acc_analytics import magnitude
+
+SUMMARY_COLUMNS = ["cast_id", "cruise", "start_time", "end_time", "duration_min", "max_depth",
+                   "time_on_bottom_min", "max_tension", "max_wire_out", "peak_acc", "error"]
+TENSION_COLUMNS = ["Tension", "Calc Tension"]
+
+def cast_windows(cruise=None):
+    # One row per cast with the logged deployment window from dredge_data, if any
+    conn = connect()
+    casts = pd.read_sql_query('''
+        SELECT s.cast_id, MAX(s.cruise) AS cruise,
+               MAX(d.start_date || ' ' || d.start_time) AS start_time,
+               MAX(d.end_date || ' ' || d.end_time) AS end_time
+        FROM sensor_data s LEFT JOIN dredge_data d ON d.cast_id = s.cast_id
+        WHERE ? IS NULL OR s.cruise = ?
+        GROUP BY s.cast_id
+        ORDER BY MIN(s.id)
+    ''', conn, params=(cruise, cruise))
+    conn.close()
+    return casts
+
+def _column_max(df, columns):
+    for col in columns:
+        if df is not None and col in df.columns and df[col].notna().any():
+            return float(df[col].max())
+    return np.nan
+
+def _clip(df, start, end):
+    return df[(df["datetime"] >= start) & (df["datetime"] <= end)].reset_index(drop=True)
+
+def summarize_cast(cast):
+    # Runs in a worker process; failures are recorded on the row instead of aborting the run
+    row = {col: cast.get(col) for col in ["cast_id", "cruise", "start_time", "end_time"]}
+    try:
+        frames = {}
+        for file_name, file_path in cast_files(cast["cast_id"]):
+            kind = sensor_kind(file_name)
+            if file_name.lower().endswith((".dat", ".acc")) and kind not in frames:
+                frames[kind] = load_sensor(resolve_sensor_path(file_path, file_name), kind)
+        dat, acc = frames.get("dat"), frames.get("acc")
+
+        start = pd.to_datetime(cast.get("start_time"), errors="coerce")
+        end = pd.to_datetime(cast.get("end_time"), errors="coerce")
+        ref = dat if dat is not None else acc
+        if (pd.isna(start) or pd.isna(end)) and ref is not None:
+            start, end = ref["datetime"].min(), ref["datetime"].max()
+        elif pd.notna(start) and pd.notna(end):
+            # Logged deployment window: leave out deck handling and transit, as for the winch
+            dat = _clip(dat, start, end) if dat is not None else None
+            acc = _clip(acc, start, end) if acc is not None else None
+        row["start_time"], row["end_time"] = str(start), str(end)
+        row["duration_min"] = (end - start).total_seconds() / 60 if pd.notna(start) and pd.notna(end) else np.nan
+
+        row["max_depth"] = _column_max(dat, ["press"])
+        row["time_on_bottom_min"] = np.nan
+        if dat is not None and dat["press"].notna().any():
+            deep = bottom_mask(dat["press"]).to_numpy()
+            dt = dat["datetime"].diff().dt.total_seconds().to_numpy()
+            row["time_on_bottom_min"] = float(np.nansum(dt[1:][deep[1:] & deep[:-1]])) / 60
+        row["peak_acc"] = float(np.nanmax(magnitude(acc))) if acc is not None and len(acc) else np.nan
+
+        winch = None
+        if pd.notna(start) and pd.notna(end):
+            parts = []
+            for meta in overlapping_winch(start, end).values():
+                df = load_winch(meta)
+                parts.append(_clip(df, start, end))
+            winch = pd.concat(parts, ignore_index=True) if parts else None
+        row["max_tension"] = _column_max(winch, TENSION_COLUMNS)
+        row["max_wire_out"] = _column_max(winch, ["Wire_out"])
+        row["error"] = None
+    except Exception as e:
+        traceback.print_exc()
+        row["error"] = f"{type(e).__name__}: {e}"
+    return row
+
+def summarize_cruise(cruise=None, workers=None):
+    casts = cast_windows(cruise).to_dict("records")
+    if not casts:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    workers = workers or os.cpu_count() or 1
+    # Casts are in deployment order, so consecutive chunks tend to share winch day files
+    # and reuse them from the worker's dataset cache
+    chunksize = max(1, len(casts) // (workers * 4))
+    if workers == 1:
+        rows = [summarize_cast(cast) for cast in casts]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(summarize_cast, casts, chunksize=chunksize))
+    return pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+
+def store_summary(summary):
+    computed_at = datetime.datetime.now().isoformat(timespec="seconds")
+    rows = summary.astype(object).where(summary.notna(), None)
+    conn = connect()
+    conn.executemany(f'''
+        INSERT OR REPLACE INTO cast_summary ({", ".join(SUMMARY_COLUMNS)}, computed_at)
+        VALUES ({", ".join("?" * len(SUMMARY_COLUMNS))}, ?)
+    ''', [(*row, computed_at) for row in rows.itertuples(index=False)])
+    conn.commit()
+    conn.close()
+
+def write_report(summary, path):
+    if path.endswith(".parquet"):
+        summary.to_parquet(path, index=False)
+    else:
+        summary.to_csv(path, index=False)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize every cast of a cruise")
+    parser.add_argument("--cruise", help="Only casts of this cruise (default: all)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    parser.add_argument("--out", default="cast_summary.csv", help="Report path (.csv or .parquet)")
+    args = parser.parse_args()
+    summary = summarize_cruise(args.cruise, args.workers)
+    store_summary(summary)
+    write_report(summary, args.out)
+    print(summary.to_string(index=False))
@@ -0,0 +1,214 @@
+import os
+import sys
+import csv
+import json
+import time
+import shutil
+import socket
+import argparse
+import threading
+import subprocess
+import numpy as np
+import pandas as pd
+import requests
+import psutil
+
+# Load test for the dash_winch resampler viewer. Each sweep point starts the app in a
+# subprocess with DASH_WINCH_POINTS set, then N client threads replay scripted
+# zoom / pan / reset relayout sequences against the relayout callback, as the browser
+# would post them. Latency is per callback round trip; memory is the peak RSS of the
+# server process tree. Only dash_winch is covered: dashapp needs an upload first.
+
+HOST = "127.0.0.1"
+START = pd.Timestamp("2020-01-01")
+READY_TIMEOUT_S = 300
+SCRIPTS = ["zoom", "pan", "reset"]
+
+def free_port():
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+def server_command(points, workers, port):
+    # gunicorn gives real prefork workers where installed; otherwise the werkzeug
+    # server forks up to `workers` processes (one thread when workers == 1)
+    if shutil.which("gunicorn"):
+        return ["gunicorn", "--workers", str(workers), "--bind", f"{HOST}:{port}", "dash_winch:server"]
+    return [sys.executable, os.path.abspath(__file__), "serve", "--points", str(points),
+            "--workers", str(workers), "--port", str(port)]
+
+def serve(points, workers, port):
+    os.environ["DASH_WINCH_POINTS"] = str(points)
+    from werkzeug.serving import run_simple
+    import dash_winch
+    if workers > 1:
+        run_simple(HOST, port, dash_winch.server, processes=workers, threaded=False)
+    else:
+        run_simple(HOST, port, dash_winch.server, threaded=False)
+
+def start_server(points, workers):
+    port = free_port()
+    env = dict(os.environ, DASH_WINCH_POINTS=str(points))
+    proc = subprocess.Popen(server_command(points, workers, port), env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    url = f"http://{HOST}:{port}"
+    deadline = time.time() + READY_TIMEOUT_S
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited: {proc.stderr.read().decode(errors='replace')[-2000:]}")
+        try:
+            if requests.get(url + "/_dash-dependencies", timeout=2).ok:
+                return proc, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    stop_server(proc)
+    raise RuntimeError(f"Server not ready after {READY_TIMEOUT_S} s")
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+def relayout_callback(url):
+    # Output spec of the callback fed by plot.relayoutData, as the renderer sends it
+    for dep in requests.get(url + "/_dash-dependencies", timeout=10).json():
+        if {"id": "plot", "property": "relayoutData"} in dep["inputs"]:
+            output = dep["output"]
+            component, prop = output.split(".", 1)
+            return {"output": output, "outputs": {"id": component, "property": prop}}
+    raise RuntimeError("No relayoutData callback found; is dash_winch wired for resampling?")
+
+def x_range(start_s, end_s):
+    return {"xaxis.range[0]": str(START + pd.Timedelta(seconds=start_s)),
+            "xaxis.range[1]": str(START + pd.Timedelta(seconds=end_s))}
+
+def script_steps(script, points, rng, n_steps):
+    # Relayout payloads for one scripted interaction over a `points`-second series
+    if script == "reset":
+        return [{"xaxis.autorange": True, "xaxis.showspikes": False}] * n_steps
+    center = rng.uniform(0.1, 0.9) * points
+    width = points / 4
+    steps = []
+    for _ in range(n_steps):
+        if script == "zoom":
+            width = max(width / 2, 10)
+        else:
+            center = min(max(center + rng.choice([-1, 1]) * width / 3, width / 2), points - width / 2)
+        steps.append(x_range(center - width / 2, center + width / 2))
+    return steps
+
+def client(url, callback, points, n_requests, seed, results):
+    # One simulated operator: scripts in random order until n_requests are sent
+    rng = np.random.default_rng(seed)
+    session = requests.Session()
+    sent = 0
+    while sent < n_requests:
+        script = SCRIPTS[rng.integers(len(SCRIPTS))]
+        for relayout in script_steps(script, points, rng, min(5, n_requests - sent)):
+            body = dict(callback, inputs=[{"id": "plot", "property": "relayoutData", "value": relayout}],
+                        changedPropIds=["plot.relayoutData"], state=[])
+            t0 = time.perf_counter()
+            try:
+                ok = session.post(url + "/_dash-update-component", data=json.dumps(body),
+                                  headers={"Content-Type": "application/json"}, timeout=120).status_code == 200
+            except requests.RequestException:
+                ok = False
+            results.append((script, time.perf_counter() - t0, ok))
+            sent += 1
+
+def tree_rss(proc):
+    try:
+        parent = psutil.Process(proc.pid)
+        procs = [parent] + parent.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return 0
+    total = 0
+    for p in procs:
+        try:
+            total += p.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return total
+
+def run_point(points, workers, clients, n_requests, seed=0):
+    proc, url = start_server(points, workers)
+    try:
+        idle_rss = tree_rss(proc)
+        peak = [idle_rss]
+        done = threading.Event()
+
+        def sample_memory():
+            while not done.is_set():
+                peak[0] = max(peak[0], tree_rss(proc))
+                time.sleep(0.1)
+
+        callback = relayout_callback(url)
+        results = []
+        sampler = threading.Thread(target=sample_memory, daemon=True)
+        sampler.start()
+        threads = [threading.Thread(target=client, args=(url, callback, points, n_requests, seed + i, results))
+                   for i in range(clients)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        done.set()
+        sampler.join()
+    finally:
+        stop_server(proc)
+
+    latency = np.array([r[1] for r in results if r[2]]) * 1000
+    p50, p95, p99 = np.percentile(latency, [50, 95, 99]) if len(latency) else (np.nan,) * 3
+    return {
+        "points": points, "workers": workers, "clients": clients,
+        "requests": len(results), "errors": sum(not r[2] for r in results),
+        "req_per_s": round(len(results) / elapsed, 1),
+        "p50_ms": round(float(p50), 1), "p95_ms": round(float(p95), 1), "p99_ms": round(float(p99), 1),
+        "idle_rss_mb": round(idle_rss / 1e6, 1), "peak_rss_mb": round(peak[0] / 1e6, 1),
+    }
+
+def sweep(points_list, workers_list, clients_list, n_requests, out=None):
+    rows = []
+    header = f"{'points':>10}{'workers':>8}{'clients':>8}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>7}{'peak MB':>9}"
+    print(header)
+    for points in points_list:
+        for workers in workers_list:
+            for clients in clients_list:
+                row = run_point(points, workers, clients, n_requests)
+                rows.append(row)
+                print(f"{points:>10}{workers:>8}{clients:>8}{row['req_per_s']:>8}{row['p50_ms']:>9}"
+                      f"{row['p95_ms']:>9}{row['p99_ms']:>9}{row['errors']:>7}{row['peak_rss_mb']:>9}")
+    if out:
+        with open(out, "w", newline="") as fh:
+            writer = csv.DictWriter(fh, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Wrote {out}")
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the dash_winch resampler viewer")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="sweep dataset size, worker count and client count")
+    run.add_argument("--points", type=int, nargs="+", default=[200_000, 2_000_000])
+    run.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    run.add_argument("--clients", type=int, nargs="+", default=[1, 4, 8])
+    run.add_argument("--requests", type=int, default=50, help="relayout callbacks per client")
+    run.add_argument("--out", help="CSV file for the results")
+    srv = sub.add_parser("serve", help="run the app under the werkzeug server (used by run)")
+    srv.add_argument("--points", type=int, required=True)
+    srv.add_argument("--workers", type=int, default=1)
+    srv.add_argument("--port", type=int, required=True)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.points, args.workers, args.port)
+    else:
+        sweep(args.points, args.workers, args.clients, args.requests, args.out)
@@ -1,26 +1,40 @@
-from dash import Dash, dcc, html
+import os
+from dash import Dash, dcc, html, Input, Output
 from plotly_resampler import FigureResampler, register_plotly_resampler
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 
-N = 2_000_000
-df = pd.DataFrame({
-    "t": pd.date_range("2020-01-01", periods=N, freq="s"),
-    "y": np.sin(np.linspace(0, 1000, N))
-})
+N = int(os.environ.get("DASH_WINCH_POINTS", 2_000_000))
+START = "2020-01-01"
 
-app = Dash(__name__)
+def make_app(n_points=N):
+    df = pd.DataFrame({
+        "t": pd.date_range(START, periods=n_points, freq="s"),
+        "y": np.sin(np.linspace(0, 1000, n_points))
+    })
 
-fig = FigureResampler(go.Figure())
-fig.add_trace(go.Scattergl(name="signal"), hf_x=df["t"], hf_y=df["y"])
+    app = Dash(__name__)
 
-app.layout = html.Div([
-    html.H1("Dynamic downsampling demo"),
-    dcc.Graph(id="plot", figure=fig)
-])
+    fig = FigureResampler(go.Figure())
+    fig.add_trace(go.Scattergl(name="signal"), hf_x=df["t"], hf_y=df["y"])
 
-register_plotly_resampler(app)
+    app.layout = html.Div([
+        html.H1("Dynamic downsampling demo"),
+        dcc.Graph(id="plot", figure=fig)
+    ])
+
+    # Zoom and pan send relayoutData; the resampler answers with the visible range re-aggregated
+    @app.callback(Output("plot", "figure", allow_duplicate=True), Input("plot", "relayoutData"),
+                  prevent_initial_call=True)
+    def update_plot(relayout_data):
+        return fig.construct_update_data_patch(relayout_data)
+
+    register_plotly_resampler(app)
+    return app
+
+app = make_app()
+server = app.server
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,106 @@
+import os
+import sys
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Process-wide, so every Streamlit session on the server shares one copy of each dataset
+BUDGET_BYTES = int(os.environ.get("DREDGE_CACHE_BYTES", 2 * 1024 ** 3))
+FINGERPRINT_BYTES = 1024 * 1024
+
+_entries = OrderedDict()  # key -> (value, nbytes), least recently used first
+_lock = threading.Lock()
+_key_locks = {}
+_fingerprints = {}
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "oversize": 0}
+
+def footprint(obj):
+    # Real memory held by an entry: deep DataFrame usage, array buffers, containers summed
+    if hasattr(obj, "memory_usage") and hasattr(obj, "columns"):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if hasattr(obj, "memory_usage"):
+        return int(obj.memory_usage(index=True, deep=True))
+    if hasattr(obj, "nbytes"):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(footprint(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(footprint(v) for v in obj)
+    return sys.getsizeof(obj)
+
+def file_hash(path):
+    # Content fingerprint: size plus the first and last MB. Cheap on multi-GB logs and
+    # shared by identical copies; memoized on (path, size, mtime)
+    st = os.stat(path)
+    memo = (path, st.st_size, st.st_mtime_ns)
+    if memo not in _fingerprints:
+        h = hashlib.blake2b(str(st.st_size).encode(), digest_size=16)
+        with open(path, "rb") as fh:
+            h.update(fh.read(FINGERPRINT_BYTES))
+            if st.st_size > FINGERPRINT_BYTES:
+                fh.seek(max(FINGERPRINT_BYTES, st.st_size - FINGERPRINT_BYTES))
+                h.update(fh.read())
+        _fingerprints[memo] = h.hexdigest()
+    return _fingerprints[memo]
+
+def _evict(budget):
+    total = sum(nbytes for _, nbytes in _entries.values())
+    while _entries and total > budget:
+        _, (_, nbytes) = _entries.popitem(last=False)
+        total -= nbytes
+        _stats["evictions"] += 1
+
+def get(key):
+    with _lock:
+        if key in _entries:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+            return _entries[key][0]
+    return None
+
+def peek(key):
+    # Cached value without counting a hit or refreshing its LRU position
+    with _lock:
+        entry = _entries.get(key)
+    return entry[0] if entry else None
+
+def put(key, value, budget=None):
+    budget = BUDGET_BYTES if budget is None else budget
+    nbytes = footprint(value)
+    with _lock:
+        if nbytes > budget:
+            _stats["oversize"] += 1
+            return value
+        _entries[key] = (value, nbytes)
+        _entries.move_to_end(key)
+        _evict(budget)
+    return value
+
+def get_or_load(key, loader):
+    # Concurrent callers for the same key wait for a single load. Cached values are
+    # shared between sessions and must not be mutated in place.
+    value = get(key)
+    if value is not None:
+        return value
+    with _lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        value = get(key)
+        if value is not None:
+            return value
+        with _lock:
+            _stats["misses"] += 1
+        return put(key, loader())
+
+def contains(key):
+    with _lock:
+        return key in _entries
+
+def stats():
+    with _lock:
+        used = sum(nbytes for _, nbytes in _entries.values())
+        return {**_stats, "entries": len(_entries), "bytes": used, "budget": BUDGET_BYTES}
+
+def clear():
+    with _lock:
+        _entries.clear()
@@ -0,0 +1,88 @@
+import os
+import json
+import weakref
+from utils import (
+    parse_staroddi_dat,
+    parse_acc_file,
+    parse_winch_dat,
+    find_raw_file,
+    open_raw
+)
+from acc_analytics import add_acc_channels
+from out_of_core import large_sensor, large_winch, overview
+import dataset_cache
+import time_axis
+
+# Cached loaders shared by every page; keys combine the file fingerprint with the
+# parse settings so identical files hit regardless of where they are stored. An optional
+# executor (e.g. a process pool) runs the parse itself; results are cached in this process.
+# Sensor frames are cached with their datetime column as a compact time axis and get the
+# column back on read; the expanded frame is shared while any session still holds it.
+# Files too large to parse in memory load as a min/max overview (see out_of_core)
+
+def sensor_kind(file_name):
+    return "acc" if file_name.lower().endswith(".acc") else "dat"
+
+def sensor_key(path, kind):
+    return (dataset_cache.file_hash(find_raw_file(path)), kind)
+
+def parse_sensor(path, kind):
+    parser = parse_acc_file if kind == "acc" else parse_staroddi_dat
+    with open_raw(find_raw_file(path)) as fh:
+        return parser(fh)
+
+def _parse(executor, fn, *args):
+    if executor is None:
+        return lambda: fn(*args)
+    return lambda: executor.submit(fn, *args).result()
+
+def compact(df):
+    # Cache form of a regularly sampled frame; frames whose clock does not compress stay as is
+    axis = time_axis.from_times(df["datetime"])
+    if not time_axis.is_compact(axis):
+        return df
+    return {"frame": df.drop(columns=["datetime"]), "axis": axis, "position": df.columns.get_loc("datetime"),
+            "dtype": df["datetime"].dtype}
+
+def expand(value):
+    if not isinstance(value, dict):
+        return value
+    df = value["expanded"]() if "expanded" in value else None
+    if df is None:
+        df = value["frame"].copy(deep=False)
+        df.insert(value["position"], "datetime", time_axis.to_numpy(value["axis"]).astype(value["dtype"], copy=False))
+        value["expanded"] = weakref.ref(df)
+    return df
+
+def frame_axis(key, df):
+    # Time axis of a loaded frame, from its cache entry when that holds one
+    value = dataset_cache.peek(key)
+    return value["axis"] if isinstance(value, dict) else time_axis.from_times(df["datetime"])
+
+def load_sensor(path, kind, executor=None):
+    spec = large_sensor(path, kind)
+    if spec is not None:
+        return dataset_cache.get_or_load(sensor_key(path, kind) + ("overview",), lambda: overview(spec))
+    parse = _parse(executor, parse_sensor, path, kind)
+    return expand(dataset_cache.get_or_load(sensor_key(path, kind), lambda: compact(parse())))
+
+def acc_channels_key(path, window_s):
+    return (dataset_cache.file_hash(find_raw_file(path)), "acc_channels", window_s)
+
+def load_acc_channels(path, window_s, executor=None):
+    key = acc_channels_key(path, window_s)
+    return expand(dataset_cache.get_or_load(key, lambda: compact(add_acc_channels(load_sensor(path, "acc", executor), window_s))))
+
+def winch_settings_key(meta):
+    return json.dumps({k: meta.get(k) for k in ["delimiter", "header_lines", "columns", "datetime_code", "parser"]},
+                      sort_keys=True)
+
+def winch_key(meta):
+    raw = find_raw_file(os.path.join(meta["file_path"], meta["file_name"]))
+    return (dataset_cache.file_hash(raw), "winch", winch_settings_key(meta))
+
+def load_winch(meta, executor=None):
+    spec = large_winch(meta)
+    if spec is not None:
+        return dataset_cache.get_or_load(winch_key(meta) + ("overview",), lambda: overview(spec))
+    return dataset_cache.get_or_load(winch_key(meta), _parse(executor, parse_winch_dat, meta["file_name"], meta))
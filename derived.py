@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import dataset_cache
+
+# Derived channels are vectorized functions of source columns. They are computed only
+# when a page asks for one and memoized in the dataset cache under the key of the
+# frame they came from (file fingerprint plus parse settings)
+
+DBAR_TO_M = 0.9945  # seawater at mid latitudes, within ~1% over the full depth range
+MIN_SCOPE_DEPTH_M = 5.0
+
+CHANNELS = {}
+
+def channel(name, sources, unit, needs_depth=False):
+    # needs_depth: the function also gets a (datetime, depth) frame from the cast's pressure record
+    def register(fn):
+        CHANNELS[name] = {"fn": fn, "sources": sources, "unit": unit, "needs_depth": needs_depth}
+        return fn
+    return register
+
+def _seconds(df):
+    return df["datetime"].to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+
+@channel("depth", ["press"], "m")
+def depth(df):
+    return df["press"] * DBAR_TO_M
+
+@channel("tilt_magnitude", ["tilt_x", "tilt_y", "tilt_z"], "deg")
+def tilt_magnitude(df):
+    return np.sqrt(df["tilt_x"] ** 2 + df["tilt_y"] ** 2 + df["tilt_z"] ** 2)
+
+@channel("wire_out_rate", ["Wire_out"], "m/min")
+def wire_out_rate(df):
+    dw = np.diff(df["Wire_out"].to_numpy(dtype=float), prepend=np.nan)
+    dt = np.diff(_seconds(df), prepend=np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = np.where(dt > 0, dw / dt * 60, np.nan)
+    return pd.Series(rate, index=df.index)
+
+@channel("scope_ratio", ["Wire_out"], "", needs_depth=True)
+def scope_ratio(df, depth_frame):
+    # Wire out over instrument depth, with depth interpolated to the winch timestamps
+    ref = depth_frame.dropna().sort_values("datetime")
+    at = np.interp(_seconds(df), _seconds(ref), ref["depth"].to_numpy(dtype=float), left=np.nan, right=np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(at > MIN_SCOPE_DEPTH_M, df["Wire_out"].to_numpy(dtype=float) / at, np.nan)
+    return pd.Series(ratio, index=df.index)
+
+def available(df, has_depth=False):
+    return [name for name, spec in CHANNELS.items()
+            if all(col in df.columns for col in spec["sources"]) and (has_depth or not spec["needs_depth"])]
+
+def label(column):
+    spec = CHANNELS.get(column)
+    if spec is None:
+        return column
+    return f"{column} (derived, {spec['unit']})" if spec["unit"] else f"{column} (derived)"
+
+def derive(df, name, key, depth_ref=None):
+    # key identifies the loaded frame; depth_ref is (key, frame) of the cast's pressure record
+    spec = CHANNELS[name]
+    def compute():
+        if not spec["needs_depth"]:
+            return spec["fn"](df)
+        ref_key, ref_df = depth_ref
+        depth_frame = pd.DataFrame({"datetime": ref_df["datetime"], "depth": derive(ref_df, "depth", ref_key)})
+        return spec["fn"](df, depth_frame)
+    cache_key = ("derived", key, name, depth_ref[0] if spec["needs_depth"] else None)
+    return dataset_cache.get_or_load(cache_key, compute)
+
+def with_channels(df, columns, key, depth_ref=None, mask=None):
+    # df (or its rows selected by mask, a boolean mask or a row slice) plus any requested derived columns. Channels are
+    # always derived from the whole frame so the memoized result matches its key
+    rows = df if mask is None else df.iloc[mask] if isinstance(mask, slice) else df.loc[mask]
+    extra = {}
+    for col in dict.fromkeys(columns):
+        if col in CHANNELS and col not in df.columns:
+            values = derive(df, col, key, depth_ref)
+            extra[col] = values if mask is None else values[mask]
+    return rows.assign(**extra) if extra else rows
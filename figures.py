@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+# Figure builders shared by the Streamlit pages and the headless renderers
+
+RENDER_MODES = ["Lines", "Min/max per pixel", "Density"]
+RASTER_WIDTH = 1200
+RASTER_HEIGHT = 200
+TRACE_COLOR = "#636efa"
+
+def decimate(df, n_points):
+    step = max(1, len(df) // n_points)
+    return df.iloc[::step].reset_index(drop=True)
+
+def _samples(df, column, x_offset_s):
+    # Finite (time ns, value) pairs of one channel
+    x = df["datetime"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    y = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)
+    keep = (x != np.iinfo(np.int64).min) & np.isfinite(y)
+    return x[keep] + int(x_offset_s * 1e9), y[keep]
+
+def _bins(values, n):
+    lo = values.min()
+    span = max(float(values.max() - lo), 1e-12)
+    return np.rint((values - lo) / span * (n - 1)).astype(np.int64), lo, span / max(n - 1, 1)
+
+def minmax_columns(x, y, width=RASTER_WIDTH):
+    # Min and max of every sample falling in each pixel column; cost beyond the single
+    # pass over the samples depends only on the output width
+    cols, x0, step = _bins(x, width)
+    if np.any(cols[1:] < cols[:-1]):
+        order = np.argsort(cols, kind="stable")
+        cols, y = cols[order], y[order]
+    starts = np.flatnonzero(np.r_[True, cols[1:] != cols[:-1]])
+    return x0 + cols[starts] * step, np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts)
+
+def density_grid(x, y, width=RASTER_WIDTH, height=RASTER_HEIGHT):
+    # Sample counts per (row, column) pixel
+    cols, x0, x_step = _bins(x, width)
+    rows, y0, y_step = _bins(y, height)
+    counts = np.bincount(rows * width + cols, minlength=width * height).reshape(height, width)
+    return x0 + np.arange(width) * x_step, y0 + np.arange(height) * y_step, counts
+
+def panel_traces(df, column, mode="Lines", x_offset_s=0, name=None):
+    # Traces drawing one channel: every given row as a line, or every sample
+    # aggregated to the raster resolution
+    name = name or column
+    if mode == "Lines":
+        x = df["datetime"] + pd.to_timedelta(x_offset_s, unit="s") if x_offset_s else df["datetime"]
+        return [go.Scatter(x=x, y=df[column], name=name, mode="lines")]
+    x, y = _samples(df, column, x_offset_s)
+    if not len(x):
+        return []
+    if mode == "Density":
+        xs, ys, counts = density_grid(x, y)
+        z = np.where(counts > 0, np.log10(counts, where=counts > 0, out=np.zeros(counts.shape)), np.nan)
+        return [go.Heatmap(x=pd.to_datetime(xs), y=ys, z=z, colorscale="Viridis", showscale=False, name=name,
+                           customdata=counts, hovertemplate="%{x}<br>%{y:.3g}: %{customdata} samples<extra></extra>")]
+    xs, lo, hi = minmax_columns(x, y)
+    xs = pd.to_datetime(xs)
+    return [go.Scatter(x=xs, y=lo, name=f"{name} min", mode="lines", line=dict(color=TRACE_COLOR, width=1)),
+            go.Scatter(x=xs, y=hi, name=f"{name} max", mode="lines", line=dict(color=TRACE_COLOR, width=1), fill="tonexty")]
+
+def stacked_figure(panels, height=600, mode="Lines"):
+    # panels: (title, df, column, x_offset_s) stacked top to bottom on a shared time axis.
+    # Raster modes expect full-resolution frames; line mode expects decimated ones
+    fig = make_subplots(
+        rows=max(1, len(panels)),
+        cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.05,
+        subplot_titles=tuple(title for title, _, _, _ in panels)
+    )
+    for row, (title, df, column, x_offset_s) in enumerate(panels, start=1):
+        for trace in panel_traces(df, column, mode, x_offset_s, title):
+            fig.add_trace(trace, row=row, col=1)
+        # Pressure increases with depth, so draw it downwards
+        if column == "press":
+            fig.update_yaxes(autorange="reversed", row=row, col=1)
+    fig.update_layout(height=height, template="plotly_white", showlegend=False)
+    return fig
@@ -0,0 +1,184 @@
+import json
+import datetime
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import streamlit as st
+from utils import parse_winch_dat, get_time_range
+from catalog import connect, winch_meta, sensor_file
+from aggregates import parse_sensor_file, store_aggregates
+from qc import store_qc, describe
+from time_index import store_index
+from datasets import sensor_kind
+from out_of_core import large_sensor, large_winch, ingest as ingest_chunked
+
+MAX_WORKERS = 2
+
+JOB_HANDLERS = {}
+_pool = None
+_pool_lock = threading.Lock()
+
+def job(kind):
+    def register(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return register
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+def _update(job_id, **fields):
+    fields["updated_at"] = _now()
+    conn = connect()
+    conn.execute(
+        f"UPDATE ingest_jobs SET {', '.join(f'{k}=?' for k in fields)} WHERE id=?",
+        (*fields.values(), job_id)
+    )
+    conn.commit()
+    conn.close()
+
+def _get_pool():
+    # One pool per server process; jobs a previous process left behind cannot resume
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            conn = connect()
+            conn.execute(
+                "UPDATE ingest_jobs SET status='failed', message='Interrupted by server restart', updated_at=? "
+                "WHERE status IN ('queued', 'running')", (_now(),)
+            )
+            conn.commit()
+            conn.close()
+            _pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="ingest")
+        return _pool
+
+def submit(kind, params, parent_id=None):
+    pool = _get_pool()
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO ingest_jobs (kind, params, parent_id, status, progress, message, created_at, updated_at)
+        VALUES (?, ?, ?, 'queued', 0, '', ?, ?)
+    ''', (kind, json.dumps(params), parent_id, _now(), _now()))
+    job_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+    pool.submit(_run, job_id, kind, params)
+    return job_id
+
+def _run(job_id, kind, params):
+    def report(progress, message=""):
+        _update(job_id, progress=progress, message=message)
+    _update(job_id, status="running")
+    try:
+        message = JOB_HANDLERS[kind](job_id, params, report) or ""
+        _update(job_id, status="done", progress=1.0, message=message)
+    except Exception as e:
+        traceback.print_exc()
+        _update(job_id, status="failed", message=f"{type(e).__name__}: {e}")
+
+def recent_jobs(limit=10):
+    conn = connect()
+    df = pd.read_sql_query(
+        'SELECT id, kind, parent_id, status, progress, message, created_at, updated_at '
+        'FROM ingest_jobs ORDER BY id DESC LIMIT ?', conn, params=(limit,)
+    )
+    conn.close()
+    return df
+
+@job("winch_ingest")
+def winch_ingest(job_id, params, report):
+    meta = winch_meta(params["file_id"])
+    spec = large_winch(meta)
+    if spec is not None:
+        return _ingest_out_of_core(job_id, "winch", "winch", params["file_id"], spec, report)
+    report(0.1, "Parsing winch file")
+    df = parse_winch_dat(None, meta)
+    report(0.8, f"Parsed {len(df)} rows")
+    start_datetime, end_datetime = get_time_range(df)
+    conn = connect()
+    conn.execute('UPDATE winch_data SET start_time=?, end_time=? WHERE id=?',
+                 (str(start_datetime), str(end_datetime), params["file_id"]))
+    conn.commit()
+    report(0.85, "Running QC")
+    summary = store_qc(conn, "winch", params["file_id"], df)
+    # Aggregates come from the frame already in memory so the file is parsed only once
+    report(0.9, "Computing aggregates")
+    store_aggregates(conn, "winch", params["file_id"], df)
+    conn.close()
+    report(0.95, "Writing columnar copy")
+    from sql_store import store_parquet  # duckdb stays out of the import pages until a job needs it
+    store_parquet("winch", params["file_id"], df)
+    submit("time_index", {"source": "winch", "file_id": params["file_id"]}, parent_id=job_id)
+    return f"{len(df)} rows, {start_datetime} to {end_datetime}; QC: {describe(summary)}"
+
+@job("sensor_ingest")
+def sensor_ingest(job_id, params, report):
+    file_name, path = sensor_file(params["file_id"])
+    if not file_name.lower().endswith((".dat", ".acc")):
+        return "Not a .DAT/.ACC file; stored without parsing"
+    spec = large_sensor(path, sensor_kind(file_name))
+    if spec is not None:
+        from sql_store import table_for
+        return _ingest_out_of_core(job_id, "sensor", table_for("sensor", file_name), params["file_id"], spec, report)
+    report(0.1, f"Parsing {file_name}")
+    df = parse_sensor_file(path, file_name)
+    report(0.8, f"Parsed {len(df)} rows")
+    start_datetime, end_datetime = get_time_range(df)
+    conn = connect()
+    conn.execute('UPDATE sensor_data SET start_time=?, end_time=? WHERE id=?',
+                 (str(start_datetime), str(end_datetime), params["file_id"]))
+    conn.commit()
+    report(0.85, "Running QC")
+    summary = store_qc(conn, "sensor", params["file_id"], df)
+    report(0.9, "Computing aggregates")
+    store_aggregates(conn, "sensor", params["file_id"], df)
+    conn.close()
+    report(0.95, "Writing columnar copy")
+    from sql_store import store_parquet, table_for
+    store_parquet(table_for("sensor", file_name), params["file_id"], df)
+    submit("time_index", {"source": "sensor", "file_id": params["file_id"]}, parent_id=job_id)
+    return f"{len(df)} rows, {start_datetime} to {end_datetime}; QC: {describe(summary)}"
+
+def _ingest_out_of_core(job_id, source, table, file_id, spec, report):
+    # Files above the memory budget: one chunked pass does what the in-memory ingest does
+    report(0.1, "File exceeds the memory budget; processing in chunks")
+    conn = connect()
+    n, start_datetime, end_datetime, summary = ingest_chunked(conn, source, table, file_id, spec, report)
+    catalog_table = "winch_data" if source == "winch" else "sensor_data"
+    conn.execute(f'UPDATE {catalog_table} SET start_time=?, end_time=? WHERE id=?',
+                 (str(start_datetime), str(end_datetime), file_id))
+    conn.commit()
+    conn.close()
+    submit("time_index", {"source": source, "file_id": file_id}, parent_id=job_id)
+    return f"{n} rows (out-of-core), {start_datetime} to {end_datetime}; QC: {describe(summary)}"
+
+@job("time_index")
+def build_time_index(job_id, params, report):
+    conn = connect()
+    n = store_index(conn, params["source"], params["file_id"])
+    conn.close()
+    return "Compressed file; windows are read by full parse" if n is None else f"{n} index points"
+
+@job("archive")
+def archive(job_id, params, report):
+    from archive import archive_cruise  # zarr and netCDF4 load only for archive jobs
+    result = archive_cruise(params["cruise"], params.get("out_dir", "archive"), params["formats"], report=report)
+    errors = sum(len(r["errors"]) for r in result.values())
+    return "; ".join(f"{r['path']}: {len(r['rows'])} file(s)" for r in result.values()) + \
+        (f"; {errors} file(s) failed" if errors else "")
+
+@st.fragment(run_every=2)
+def job_panel(limit=5):
+    # Polls the job table so progress updates without rerunning the page
+    jobs = recent_jobs(limit)
+    if jobs.empty:
+        return
+    st.subheader("Background jobs")
+    for row in jobs.itertuples():
+        label = f"#{row.id} {row.kind} — {row.status}" + (f": {row.message}" if row.message else "")
+        if row.status == "failed":
+            st.error(label)
+        else:
+            st.progress(min(max(row.progress or 0.0, 0.0), 1.0), text=label)
@@ -0,0 +1,331 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utils import find_raw_file, open_raw
+from time_index import iter_chunks, sensor_parser, winch_parser, sensor_first_line, is_compressed, build_index, \
+    parse_window
+from qc import run_qc, store_qc_summary, flags_path, qc_columns, spike_deviation, spike_floor, QC_DIR, FLAG_NAMES, \
+    FLAG_DUPLICATE, FLAG_NONMONOTONIC, FLAG_DAY_WRAP, FLAG_GAP, FLAG_SPIKE, GAP_FACTOR, SPIKE_WINDOW, SPIKE_K
+from aggregates import minute_aggregates, rollup, store_minute_aggregates
+from acc_analytics import magnitude, sample_interval
+import dataset_cache
+
+# Out-of-core mode for instrument files whose parsed frame would not fit in memory.
+# A file is described by a spec (raw path, parser, header lines) and processed as an
+# iterator of time-ordered frames, one per raw block of CHUNK_BYTES. When a file's
+# estimated frame size exceeds BUDGET_BYTES the loaders hand out a min/max overview
+# instead of the full frame, high-res windows are parsed from the raw bytes, and
+# ingest does parsing, time range, QC, aggregates and the Parquet copy in one pass.
+
+BUDGET_BYTES = int(os.environ.get("DREDGE_FILE_BUDGET", 1024 ** 3))
+CHUNK_BYTES = 64 * 1024 * 1024
+SAMPLE_BYTES = 1024 * 1024
+COMPRESSED_RATIO = 5  # gzip/zstd of these text logs; the uncompressed size is not stored
+OVERVIEW_BINS = 20000
+FLOOR_SAMPLE_ROWS = 1000000  # rows kept per channel to estimate the whole-file spike floor
+BLOCK_ROWS = 1000000
+
+_estimates = {}
+
+def _empty():
+    return pd.DataFrame({"datetime": pd.Series(dtype="datetime64[ns]")})
+
+def sensor_spec(path, kind):
+    path = find_raw_file(path)
+    return {"path": path, "kind": kind, "meta": None, "skip_lines": sensor_first_line(path)}
+
+def winch_spec(meta):
+    path = find_raw_file(os.path.join(meta["file_path"], meta["file_name"]))
+    return {"path": path, "kind": "winch", "meta": meta, "skip_lines": int(meta["header_lines"])}
+
+def parser_for(spec):
+    if spec["kind"] == "winch":
+        return winch_parser(spec["meta"])
+    return sensor_parser(f"file.{spec['kind']}")
+
+def chunks(spec, chunk_bytes=CHUNK_BYTES):
+    return iter_chunks(spec["path"], parser_for(spec), spec["skip_lines"], chunk_bytes)
+
+def _head(spec, n_bytes=SAMPLE_BYTES):
+    # First n_bytes of data lines, decompressed, cut back to a whole line
+    with open_raw(spec["path"]) as fh:
+        for _ in range(spec["skip_lines"]):
+            fh.readline()
+        data = fh.read(n_bytes)
+    return data[:data.rfind(b"\n") + 1] if len(data) == n_bytes else data
+
+def _tail(spec, n_bytes=SAMPLE_BYTES):
+    # Last n_bytes of an uncompressed file from the first whole line on
+    with open(spec["path"], "rb") as fh:
+        size = fh.seek(0, os.SEEK_END)
+        fh.seek(max(0, size - n_bytes))
+        data = fh.read()
+    return data[data.find(b"\n") + 1:] if size > n_bytes else data
+
+def estimate_bytes(spec):
+    # Parsed frame size extrapolated from the head sample's bytes per row
+    st = os.stat(spec["path"])
+    memo = (spec["path"], st.st_size, st.st_mtime_ns, spec["kind"])
+    if memo not in _estimates:
+        sample = _head(spec)
+        df = parser_for(spec)(sample) if sample.strip() else pd.DataFrame()
+        if not len(df):
+            _estimates[memo] = 0
+        else:
+            raw_size = st.st_size * (COMPRESSED_RATIO if is_compressed(spec["path"]) else 1)
+            rows = raw_size / (len(sample) / len(df))
+            _estimates[memo] = int(rows * df.memory_usage(index=True, deep=True).sum() / len(df))
+    return _estimates[memo]
+
+def too_large(spec, budget=None):
+    return estimate_bytes(spec) > (BUDGET_BYTES if budget is None else budget)
+
+def large_sensor(path, kind):
+    # Spec of a sensor file that needs out-of-core handling, else None
+    spec = sensor_spec(path, kind)
+    return spec if too_large(spec) else None
+
+def large_winch(meta):
+    spec = winch_spec(meta)
+    return spec if too_large(spec) else None
+
+def probe_time_range(spec):
+    # First and last timestamp without a full parse for uncompressed time-ordered files;
+    # compressed files can only be read front to back
+    parse = parser_for(spec)
+    if not is_compressed(spec["path"]):
+        head, tail = parse(_head(spec))["datetime"].dropna(), parse(_tail(spec))["datetime"].dropna()
+        if len(head) and len(tail):
+            return head.iloc[0], tail.iloc[-1]
+    start = end = None
+    for df in chunks(spec):
+        times = df["datetime"].dropna()
+        if len(times):
+            start = times.min() if start is None else min(start, times.min())
+            end = times.max() if end is None else max(end, times.max())
+    return start, end
+
+def envelope(frames, start, end, n_bins=OVERVIEW_BINS):
+    # Min and max of every numeric column per time bin over all frames, as two rows per
+    # bin (at its start and middle), so a line through them traces the full envelope
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    # Bin width first: nanoseconds times n_bins overflows int64 for spans over ~5 days
+    width = max((end - start).value // n_bins + 1, 1)
+    lo = hi = None
+    columns = None
+    for df in frames:
+        df = df.dropna(subset=["datetime"])
+        if columns is None:
+            columns = [c for c in df.select_dtypes("number").columns]
+            lo = np.full((n_bins, len(columns)), np.nan)
+            hi = np.full((n_bins, len(columns)), np.nan)
+        bins = ((df["datetime"].to_numpy(dtype="datetime64[ns]").astype(np.int64) - start.value)
+                // width).clip(0, n_bins - 1)
+        stats = df[columns].apply(pd.to_numeric, errors="coerce").groupby(bins).agg(["min", "max"])
+        idx = stats.index.to_numpy()
+        lo[idx] = np.fmin(lo[idx], stats.xs("min", axis=1, level=1).to_numpy(dtype="float64"))
+        hi[idx] = np.fmax(hi[idx], stats.xs("max", axis=1, level=1).to_numpy(dtype="float64"))
+    if columns is None:
+        return _empty()
+    filled = ~np.isnan(lo).all(axis=1)
+    edges = start.value + np.arange(n_bins, dtype=np.int64) * width
+    times = np.stack([edges, edges + width // 2], axis=1)[filled].ravel()
+    values = np.stack([lo, hi], axis=1)[filled].reshape(-1, len(columns))
+    out = pd.DataFrame(values, columns=columns)
+    out.insert(0, "datetime", times.view("datetime64[ns]"))
+    return out
+
+def overview(spec, n_bins=OVERVIEW_BINS):
+    start, end = probe_time_range(spec)
+    if start is None:
+        return _empty()
+    return envelope(chunks(spec), start, end, n_bins)
+
+def spectrogram(spec, column="acc_mag", nperseg=256, overlap=0.5, max_frames=2000):
+    # acc_analytics.spectrogram over the chunks of an ACC file. Frames sit on one grid of
+    # sample positions across the file, with the last partial frame of a chunk carried
+    # into the next; the mean is removed per chunk rather than over the whole record
+    start, end = probe_time_range(spec)
+    step = fs = None
+    window = np.hanning(nperseg)
+    carry_values, carry_times = np.zeros(0), np.zeros(0, dtype="datetime64[ns]")
+    position = 0  # file sample position of carry_values[0]
+    powers, frame_times = [], []
+    for df in chunks(spec):
+        if not len(df):
+            continue
+        values = magnitude(df) if column == "acc_mag" else df[column].to_numpy(dtype="float64")
+        if fs is None:
+            fs = 1.0 / sample_interval(df)
+            step = max(1, int(nperseg * (1 - overlap)))
+            n_frames = max(int((end - start).total_seconds() * fs) - nperseg, 0) // step + 1
+            step *= max(1, int(np.ceil(n_frames / max_frames)))
+        values = np.concatenate([carry_values, np.nan_to_num(values - np.nanmean(values))])
+        times = np.concatenate([carry_times, df["datetime"].to_numpy(dtype="datetime64[ns]")])
+        first = -position % step
+        if first + nperseg <= len(values):
+            frames = np.lib.stride_tricks.sliding_window_view(values[first:], nperseg)[::step]
+            powers.append(np.abs(np.fft.rfft(frames * window, axis=1)) ** 2 / (fs * (window ** 2).sum()))
+            frame_times.append(times[first + np.arange(len(frames)) * step + nperseg // 2])
+            following = first + len(frames) * step
+        else:
+            following = first
+        keep = min(following, len(values))
+        carry_values, carry_times = values[keep:], times[keep:]
+        position += keep
+    if not powers:
+        return np.array([]), pd.DatetimeIndex([]), np.empty((0, 0))
+    power = np.concatenate(powers)
+    freqs = np.fft.rfftfreq(nperseg, d=1.0 / fs)
+    return freqs, pd.DatetimeIndex(np.concatenate(frame_times)), 10 * np.log10(power.T + 1e-12)
+
+def _index(spec):
+    # Sampled line index of an uncompressed file, kept in the dataset cache
+    key = (dataset_cache.file_hash(spec["path"]), "ooc_index", spec["kind"], spec["skip_lines"])
+    return dataset_cache.get_or_load(key, lambda: build_index(spec["path"], parser_for(spec), spec["skip_lines"]))
+
+def read_window(spec, start, end):
+    # Full-resolution rows with start <= datetime <= end, read from the raw file
+    if not is_compressed(spec["path"]):
+        offsets, times, size = _index(spec)
+        if np.all(np.diff(times) >= 0) and len(offsets):
+            return parse_window(spec["path"], parser_for(spec), offsets, times, size, start, end)
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    parts = [df[(df["datetime"] >= start) & (df["datetime"] <= end)] for df in chunks(spec)]
+    return pd.concat(parts, ignore_index=True) if parts else _empty()
+
+def _spike_rows(values, carry, pending, last):
+    # Rolling windows are centred, so a row's spike deviation is final only once
+    # SPIKE_WINDOW rows after it are known. `carry` holds the previous chunk's tail: context
+    # rows and the `pending` rows still to score. Returns (rows to score, their deviation
+    # and MAD, new carry, new pending)
+    ext = np.concatenate([carry, values]) if carry is not None else values
+    done = len(ext) - len(values) - pending
+    stop = len(ext) if last else max(done, len(ext) - SPIKE_WINDOW)
+    deviation = np.empty((stop - done, ext.shape[1]))
+    mad = np.empty_like(deviation)
+    for j in range(ext.shape[1]):
+        dev, m = spike_deviation(ext[:, j])
+        deviation[:, j], mad[:, j] = dev[done:stop], m[done:stop]
+    return ext[done:stop], deviation, mad, ext[max(0, stop - SPIKE_WINDOW):], len(ext) - stop
+
+def _sample(sample, position, values, deviation):
+    # Rows whose file position is a multiple of the stride; the stride doubles whenever
+    # the sample outgrows FLOOR_SAMPLE_ROWS
+    keep = (position + np.arange(len(values))) % sample["stride"] == 0
+    sample["values"].append(values[keep])
+    sample["deviation"].append(deviation[keep])
+    if sum(len(v) for v in sample["values"]) > FLOOR_SAMPLE_ROWS:
+        sample.update(values=[np.concatenate(sample["values"])[::2]],
+                      deviation=[np.concatenate(sample["deviation"])[::2]], stride=sample["stride"] * 2)
+
+def _boundary_flags(prev_time, first_time, step):
+    # Checks run_qc makes between neighbours, for the first row of a chunk
+    if pd.isna(prev_time) or pd.isna(first_time):
+        return 0
+    dt = (first_time - prev_time).total_seconds()
+    flag = FLAG_DUPLICATE if dt == 0 else FLAG_NONMONOTONIC if dt < 0 else 0
+    if abs(dt + 86400) < 60:
+        flag |= FLAG_DAY_WRAP
+    if step > 0 and dt > GAP_FACTOR * step:
+        flag |= FLAG_GAP
+    return flag
+
+def _parquet_frame(df):
+    # Integer columns can pick up NaN in a later chunk, so numbers are stored as float64
+    numeric = [c for c in df.select_dtypes("number").columns]
+    return df.astype({c: "float64" for c in numeric})
+
+def ingest(conn, source, table, file_id, spec, report=None, chunk_bytes=CHUNK_BYTES):
+    # One pass over the chunks: time range, QC flags and summary, minute aggregates and
+    # the Parquet copy. Spike candidates (deviation above k rolling MADs) go to a scratch
+    # file and are checked against the whole-file MAD floor at the end, so spike flags
+    # match the in-memory QC; the sample interval for gap flags is per chunk. Returns
+    # (rows, start, end, QC summary)
+    from sql_store import parquet_path, ROW_GROUP_SIZE  # imports duckdb
+    os.makedirs(QC_DIR, exist_ok=True)
+    flags_tmp = flags_path(source, file_id) + ".tmp"
+    scores_tmp = flags_path(source, file_id) + ".spikes.tmp"
+    out = parquet_path(table, file_id)
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    writer = schema = columns = carry = None
+    n, scored, pending, start, end, prev_time, max_gap = 0, 0, 0, None, None, pd.NaT, 0.0
+    steps, minutes = [], []
+    sample = {"stride": 1, "values": [], "deviation": []}
+    summary = {"n_samples": 0, "channels": {}}
+    size = os.path.getsize(spec["path"]) * (COMPRESSED_RATIO if is_compressed(spec["path"]) else 1)
+    threshold = SPIKE_K * 1.4826
+    frames = chunks(spec, chunk_bytes)
+    df = next(frames, None)
+    with open(flags_tmp, "wb") as flags_out, open(scores_tmp, "wb") as scores_out:
+        i = 0
+        while df is not None:
+            following = next(frames, None)
+            flags, part = run_qc(df, check_spikes=False)
+            flags[:1] |= _boundary_flags(prev_time, df["datetime"].iloc[0], part["sample_interval_s"])
+            flags_out.write(flags.tobytes())
+            steps.append(part["sample_interval_s"])
+            max_gap = max(max_gap, part["max_gap_s"])
+            if not pd.isna(prev_time) and not pd.isna(df["datetime"].iloc[0]):
+                max_gap = max(max_gap, (df["datetime"].iloc[0] - prev_time).total_seconds())
+            for channel, stats in part["channels"].items():
+                total = summary["channels"].setdefault(channel, {})
+                for k, v in stats.items():
+                    total[k] = total.get(k, 0) + v
+            columns = qc_columns(df) if columns is None else columns
+            values, deviation, mad, carry, pending = _spike_rows(
+                df[columns].to_numpy(dtype="float64").reshape(len(df), len(columns)), carry, pending,
+                following is None)
+            _sample(sample, scored, values, deviation)
+            # Zero unless the row is a spike for any floor at or below its deviation
+            scores_out.write(np.where(deviation > threshold * mad, deviation, 0.0).tobytes())
+            scored += len(values)
+            prev_time = df["datetime"].iloc[-1]
+            times = df["datetime"].dropna()
+            if len(times):
+                start = times.min() if start is None else min(start, times.min())
+                end = times.max() if end is None else max(end, times.max())
+            minutes.append(minute_aggregates(df))
+            frame = pa.Table.from_pandas(_parquet_frame(df), preserve_index=False)
+            if writer is None:
+                schema = frame.schema
+                writer = pq.ParquetWriter(out + ".tmp", schema)
+            writer.write_table(frame.cast(schema), row_group_size=ROW_GROUP_SIZE)
+            n += len(df)
+            i += 1
+            if report:
+                report(min(0.1 + 0.8 * i * chunk_bytes / max(size, 1), 0.9), f"Processed {n} rows")
+            df = following
+    if writer is not None:
+        writer.close()
+        os.replace(out + ".tmp", out)
+    if n:
+        values, deviation = np.concatenate(sample["values"]), np.concatenate(sample["deviation"])
+        floors = np.array([spike_floor(values[:, j], deviation[:, j]) for j in range(len(columns))])
+        flags = np.memmap(flags_tmp, dtype=np.uint8, mode="r+")
+        scores = np.memmap(scores_tmp, dtype=np.float64, mode="r", shape=(n, len(columns)))
+        spikes = np.zeros(len(columns), dtype=np.int64)
+        for a in range(0, n, BLOCK_ROWS):
+            hit = scores[a:a + BLOCK_ROWS] > threshold * floors
+            flags[a:a + BLOCK_ROWS][hit.any(axis=1)] |= FLAG_SPIKE
+            spikes += hit.sum(axis=0)
+        for col, count in zip(columns, spikes.tolist()):
+            summary["channels"].setdefault(col, {})["spike"] = count
+        summary["flags"] = {name: sum(int(np.count_nonzero(flags[a:a + BLOCK_ROWS] & bit))
+                                      for a in range(0, n, BLOCK_ROWS)) for bit, name in FLAG_NAMES.items()}
+        summary["n_flagged"] = sum(int(np.count_nonzero(flags[a:a + BLOCK_ROWS])) for a in range(0, n, BLOCK_ROWS))
+        np.save(flags_path(source, file_id), flags)
+        del flags, scores
+    else:
+        summary.update(flags={name: 0 for name in FLAG_NAMES.values()}, n_flagged=0)
+        np.save(flags_path(source, file_id), np.zeros(0, dtype=np.uint8))
+    os.remove(flags_tmp)
+    os.remove(scores_tmp)
+    summary.update(n_samples=n, sample_interval_s=float(np.median(steps)) if steps else 0.0, max_gap_s=float(max_gap),
+                   out_of_core=True)
+    store_qc_summary(conn, source, file_id, summary)
+    if minutes:
+        store_minute_aggregates(conn, source, file_id, rollup(pd.concat(minutes, ignore_index=True), "minute"))
+    return n, start, end, summary
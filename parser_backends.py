@@ -0,0 +1,99 @@
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pyarrow = None
+
+NA_VALUES = ["", "NA", "N/A", "NaN", "nan", "NULL", "null", "____"]
+SNIFF_BYTES = 64 * 1024
+AUTO_ORDER = ["pyarrow", "pandas"]
+
+# name -> (reader, supports); readers take an opener returning a fresh binary handle
+BACKENDS = {}
+
+def backend(name, supports=lambda delimiter, sample: True):
+    def register(fn):
+        BACKENDS[name] = (fn, supports)
+        return fn
+    return register
+
+def available_backends():
+    return [name for name in AUTO_ORDER if name in BACKENDS]
+
+def _single_char_delimiter(delimiter, sample):
+    # pyarrow only splits on one character; \s+ qualifies when the sample uses
+    # exactly one space (or one tab) between fields and no leading/trailing blanks
+    if len(delimiter) == 1:
+        return delimiter
+    if delimiter not in (r"\s+", " +"):
+        return None
+    lines = [line for line in sample if line.strip()]
+    for sep in (b" ", b"\t"):
+        if lines and all(line == sep.join(line.split()) for line in lines):
+            return sep.decode()
+    return None
+
+def _sample(opener, header_lines):
+    # Complete lines from the head of the file, after the header
+    with opener() as fh:
+        data = fh.read(SNIFF_BYTES)
+    lines = data.splitlines()[header_lines:]
+    return lines[:-1] if len(data) == SNIFF_BYTES else lines
+
+@backend("pandas")
+def read_pandas(opener, delimiter, header_lines, columns):
+    with opener() as fh:
+        return pd.read_csv(
+            fh,
+            delimiter=delimiter,
+            skiprows=header_lines,
+            names=columns,
+            header=None,
+            na_values="____"
+        )
+
+if pyarrow is not None:
+    def _text_columns(sample, sep, columns):
+        # Columns pyarrow would turn into dates, times or timestamps; pandas keeps them as text
+        table = pa_csv.read_csv(
+            pyarrow.py_buffer(b"\n".join(sample) + b"\n"),
+            read_options=pa_csv.ReadOptions(column_names=columns),
+            parse_options=pa_csv.ParseOptions(delimiter=sep),
+            convert_options=pa_csv.ConvertOptions(null_values=NA_VALUES, strings_can_be_null=True),
+        )
+        return {field.name: pyarrow.string() for field in table.schema if pyarrow.types.is_temporal(field.type)}
+
+    @backend("pyarrow", supports=lambda delimiter, sample: _single_char_delimiter(delimiter, sample) is not None)
+    def read_pyarrow(opener, delimiter, header_lines, columns):
+        sample = _sample(opener, header_lines)
+        sep = _single_char_delimiter(delimiter, sample)
+        column_types = _text_columns(sample, sep, columns) if sample else {}
+        with opener() as fh:
+            table = pa_csv.read_csv(
+                fh,
+                read_options=pa_csv.ReadOptions(skip_rows=header_lines, column_names=columns, use_threads=True),
+                parse_options=pa_csv.ParseOptions(delimiter=sep),
+                convert_options=pa_csv.ConvertOptions(null_values=NA_VALUES, strings_can_be_null=True,
+                                                      column_types=column_types),
+            )
+        return table.to_pandas()
+
+def read_table(opener, delimiter, header_lines, columns, backend_name="auto"):
+    # Try the requested backend (or each in AUTO_ORDER) and fall back on failure
+    names = available_backends() if backend_name in (None, "auto") else [backend_name, "pandas"]
+    names = [name for name in dict.fromkeys(names) if name in BACKENDS]
+    sample = None
+    errors = []
+    for name in names:
+        reader, supports = BACKENDS[name]
+        if name != "pandas":
+            sample = sample if sample is not None else _sample(opener, header_lines)
+            if not supports(delimiter, sample):
+                continue
+        try:
+            return reader(opener, delimiter, header_lines, columns)
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+    raise RuntimeError("All parser backends failed: " + "; ".join(errors))
@@ -6,15 +6,10 @@ from plotly.subplots import make_subplots
 import plotly.express as px
 import io
 import datetime
-import json
 import glob
-import os
-from utils import (
-    parse_staroddi_dat,
-    get_time_range,
-    parse_winch_dat,
-    parse_acc_file
-)
+from utils import get_time_range
+from catalog import recorded_time_range, resolve_sensor_path
+from cast_loader import load_cast_bundle
 
 # Force wide layout for Streamlit
 st.set_page_config(layout="wide")
@@ -55,63 +50,32 @@ with col1:
         winch_meta = None
         selected_winch = None
 
-        # Load selected .DAT file
-
+        # Load the selected .DAT and .ACC files and the overlapping winch files concurrently
+        dat_path = acc_path = time_range = None
         if selected_dat_file:
             dat_file_path = next(f[1] for f in dat_files if f[0] == selected_dat_file)
-            # If file_path is just 'sensor_data', join with file name
-            full_dat_path = os.path.join(dat_file_path, selected_dat_file) if os.path.isdir(dat_file_path) else os.path.join('sensor_data', selected_dat_file)
-            if not os.path.isfile(full_dat_path):
-                # Try fallback to sensor_data directory
-                full_dat_path = os.path.join('sensor_data', selected_dat_file)
-            with open(full_dat_path, 'rb') as dat_file:
-                df = parse_staroddi_dat(dat_file)
+            dat_path = resolve_sensor_path(dat_file_path, selected_dat_file)
+            time_range = recorded_time_range(selected_cast_id, selected_dat_file)
+        if selected_acc_file:
+            acc_file_path = next(f[1] for f in acc_files if f[0] == selected_acc_file)
+            acc_path = resolve_sensor_path(acc_file_path, selected_acc_file)
+        bundle = load_cast_bundle(dat_path, acc_path, time_range=time_range)
+
+        if bundle["dat"] is not None:
+            df = bundle["dat"]
             st.write("Parsed Data Preview:", df.head())
             min_dt, max_dt = get_time_range(df)
             st.write(f"Main file time range: {min_dt} to {max_dt}")
 
-        # Load selected .ACC file
-        if selected_acc_file:
-            acc_file_path = next(f[1] for f in acc_files if f[0] == selected_acc_file)
-            full_acc_path = os.path.join(acc_file_path, selected_acc_file) if os.path.isdir(acc_file_path) else os.path.join('sensor_data', selected_acc_file)
-            if not os.path.isfile(full_acc_path):
-                full_acc_path = os.path.join('sensor_data', selected_acc_file)
-            with open(full_acc_path, 'rb') as acc_file:
-                acc_df = parse_acc_file(acc_file)
+        if bundle["acc"] is not None:
+            acc_df = bundle["acc"]
             st.write("Parsed ACC Data Preview:", acc_df.head())
         # Winch metadata selection logic
         if df is not None:
-            min_dt, max_dt = get_time_range(df)
-            # Query winch_data table for overlapping winch files
-            import sqlite3
-            conn = sqlite3.connect('dredge_remote.db')
-            cursor = conn.cursor()
-            cursor.execute('SELECT file_name, file_path, start_time, end_time, settings FROM winch_data')
-            winch_rows = cursor.fetchall()
-            conn.close()
-
-            matches = []
-            meta_dict = {}
-            for row in winch_rows:
-                file_name, file_path, start_time, end_time, settings_json = row
-                try:
-                    winch_start = pd.to_datetime(start_time)
-                    winch_end = pd.to_datetime(end_time)
-                    # Check for any overlap
-                    if (winch_start <= max_dt) and (winch_end >= min_dt):
-                        matches.append(file_name)
-                        meta = json.loads(settings_json)
-                        meta['file_name'] = file_name
-                        meta['file_path'] = file_path
-                        meta_dict[file_name] = meta
-                except Exception:
-                    continue
+            matches = list(bundle["winch"])
             if matches:
                 selected_winches = st.multiselect("Select overlapping winch files:", matches, default=matches)
-                winch_dfs = []
-                for winch_file in selected_winches:
-                    winch_meta = meta_dict[winch_file]
-                    winch_dfs.append(parse_winch_dat(winch_file, winch_meta))
+                winch_dfs = [bundle["winch"][winch_file] for winch_file in selected_winches]
                 if winch_dfs:
                     winch_df = pd.concat(winch_dfs, ignore_index=True)
                     st.success(f"Loaded {len(selected_winches)} winch file(s), total rows: {len(winch_df)}.")
@@ -119,6 +83,9 @@ with col1:
                     winch_df = None
             else:
                 st.warning("No matching winch files found in database.")
+        if bundle["slowest"]:
+            source, seconds = bundle["slowest"]
+            st.caption(f"Loaded in {bundle['load_s']:.2f} s; slowest source: {source} ({seconds:.2f} s)")
 
     with st.expander("Plot Controls", expanded=True):
         if df is not None or acc_df is not None:
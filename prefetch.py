@@ -0,0 +1,162 @@
+import os
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from utils import find_raw_file
+from catalog import cast_files, recorded_time_range, resolve_sensor_path, overlapping_winch
+from datasets import sensor_key, acc_channels_key, winch_key, load_sensor, load_acc_channels, load_winch
+from cast_loader import PROCESS_BYTES
+import dataset_cache
+
+# After a cast loads, the casts next to it in the "Select Cast ID" order are parsed into
+# the dataset cache on one low-priority background thread, with the files the page
+# selects by default (first DAT, first ACC, overlapping winch). A newer request cancels
+# the pending one between files; a file is skipped when its estimated parsed size would
+# not fit in the free part of the cache budget, so prefetching never evicts what the
+# operator is looking at. Large files are parsed in a one-worker niced process pool of
+# its own, so prefetching never holds the workers of cast_loader's foreground pool.
+# Requests are kept per session: operators sharing the server each get their neighbours
+# prefetched, and one operator's next step only cancels their own pending request.
+
+ENABLED = os.environ.get("DREDGE_PREFETCH", "1") != "0"
+NEIGHBOURS = [1, -1]  # next cast first, then the previous one
+EXPANSION = 2  # parsed frame bytes per raw file byte, roughly, for the DAT/ACC/winch layouts
+NICE = 10
+
+_queue = queue.Queue()
+_lock = threading.Lock()
+_worker = None
+_pool = None
+_generations = {}  # session -> generation of its latest request
+_last_requests = {}
+_statuses = {}
+
+def _new_status():
+    return {"cast_id": None, "state": "idle", "loaded": [], "skipped": [], "errors": []}
+
+def _lower_priority():
+    # Linux schedules threads individually, so this only demotes the prefetch thread
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), NICE)
+    except (AttributeError, OSError):
+        pass
+
+def _lower_process_priority():
+    try:
+        os.nice(NICE)
+    except OSError:
+        pass
+
+def _executor_for(path):
+    # Own niced single-worker pool for files cast_loader would send to its process pool
+    global _pool
+    if os.path.getsize(find_raw_file(path)) < PROCESS_BYTES:
+        return None
+    with _lock:
+        if _pool is None:
+            # spawn: forking a threaded server process is unsafe
+            _pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_lower_process_priority)
+        return _pool
+
+def _ensure_worker():
+    global _worker
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="cast-prefetch", daemon=True)
+            _worker.start()
+
+def neighbours(cast_ids, cast_id):
+    if cast_id not in cast_ids:
+        return []
+    i = cast_ids.index(cast_id)
+    return [cast_ids[i + step] for step in NEIGHBOURS if 0 <= i + step < len(cast_ids)]
+
+def cast_tasks(cast_id, acc_window_s):
+    # (label, cache key, raw path, loader) for the files the page loads by default for a cast
+    files = cast_files(cast_id)
+    dat_files = [f for f in files if f[0].lower().endswith(".dat")]
+    acc_files = [f for f in files if f[0].lower().endswith(".acc")]
+    tasks = []
+    if dat_files:
+        file_name, file_path = dat_files[0]
+        path = resolve_sensor_path(file_path, file_name)
+        tasks.append((file_name, sensor_key(path, "dat"), path, lambda ex, p=path: load_sensor(p, "dat", ex)))
+        time_range = recorded_time_range(cast_id, file_name)
+        for winch_name, meta in (overlapping_winch(*time_range) if time_range else {}).items():
+            winch_path = os.path.join(meta["file_path"], meta["file_name"])
+            tasks.append((winch_name, winch_key(meta), winch_path, lambda ex, m=meta: load_winch(m, ex)))
+    if acc_files:
+        file_name, file_path = acc_files[0]
+        path = resolve_sensor_path(file_path, file_name)
+        if acc_window_s is None:
+            tasks.append((file_name, sensor_key(path, "acc"), path, lambda ex, p=path: load_sensor(p, "acc", ex)))
+        else:
+            tasks.append((file_name, acc_channels_key(path, acc_window_s), path,
+                          lambda ex, p=path: load_acc_channels(p, acc_window_s, ex)))
+    return tasks
+
+def fits(path):
+    cache = dataset_cache.stats()
+    return os.path.getsize(find_raw_file(path)) * EXPANSION <= cache["budget"] - cache["bytes"]
+
+def _cancelled(session, generation):
+    return generation != _generations.get(session)
+
+def _run():
+    _lower_priority()
+    while True:
+        session, generation, cast_ids, acc_window_s = _queue.get()
+        if _cancelled(session, generation):
+            continue
+        progress = _statuses[session]
+        for cast_id in cast_ids:
+            progress.update(cast_id=cast_id, state="loading")
+            try:
+                tasks = cast_tasks(cast_id, acc_window_s)
+            except Exception as e:
+                progress["errors"].append(f"{cast_id}: {type(e).__name__}: {e}")
+                continue
+            for label, key, path, load in tasks:
+                if _cancelled(session, generation):
+                    break
+                try:
+                    if dataset_cache.contains(key):
+                        continue
+                    if not fits(path):
+                        progress["skipped"].append(label)
+                        continue
+                    load(_executor_for(path))
+                    progress["loaded"].append(label)
+                except Exception as e:
+                    progress["errors"].append(f"{label}: {type(e).__name__}: {e}")
+            if _cancelled(session, generation):
+                break
+        if not _cancelled(session, generation):
+            progress.update(cast_id=None, state="idle")
+
+def schedule(cast_ids, cast_id, acc_window_s=None, session=None):
+    # Prefetch the neighbours of cast_id; supersedes whatever the session still has
+    # pending. Page reruns repeat the same request, which leaves the running one alone
+    if not ENABLED:
+        return
+    targets = neighbours(list(cast_ids), cast_id)
+    with _lock:
+        if (targets, acc_window_s, _generations.get(session)) == _last_requests.get(session):
+            return
+        generation = _generations[session] = _generations.get(session, 0) + 1
+        _last_requests[session] = (targets, acc_window_s, generation)
+        _statuses[session] = _new_status()
+    if targets:
+        _ensure_worker()
+        _queue.put((session, generation, targets, acc_window_s))
+
+def cancel(session=None):
+    with _lock:
+        _generations[session] = _generations.get(session, 0) + 1
+        _statuses[session] = _new_status()
+
+def status(session=None):
+    current = _statuses.get(session) or _new_status()
+    return {k: list(v) if isinstance(v, list) else v for k, v in current.items()}
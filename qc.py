@@ -0,0 +1,146 @@
+import os
+import json
+import datetime
+import numpy as np
+import pandas as pd
+from catalog import connect
+
+QC_DIR = "qc_flags"
+
+# Per-sample bit flags, stored as one uint8 per sample
+FLAG_NA_TIME = 1
+FLAG_NA_VALUE = 2
+FLAG_DUPLICATE = 4
+FLAG_NONMONOTONIC = 8
+FLAG_GAP = 16
+FLAG_SPIKE = 32
+FLAG_RANGE = 64
+FLAG_DAY_WRAP = 128
+FLAG_NAMES = {
+    FLAG_NA_TIME: "na_time",
+    FLAG_NA_VALUE: "na_value",
+    FLAG_DUPLICATE: "duplicate",
+    FLAG_NONMONOTONIC: "nonmonotonic",
+    FLAG_GAP: "gap",
+    FLAG_SPIKE: "spike",
+    FLAG_RANGE: "range",
+    FLAG_DAY_WRAP: "day_wrap",
+}
+
+# Plausible physical ranges; channels not listed are only checked for spikes
+RANGES = {
+    "temp": (-5, 40),
+    "press": (-10, 7000),
+    "tilt_x": (-180, 180),
+    "tilt_y": (-180, 180),
+    "tilt_z": (-180, 180),
+    "g": (0, 20),
+    "x_acc": (-20, 20),
+    "y_acc": (-20, 20),
+    "z_acc": (-20, 20),
+    "Tension": (-1, 100),
+    "Calc Tension": (-1, 100),
+    "Wire_out": (-100, 15000),
+}
+SKIP_COLUMNS = ["index", "rownum", "datetime", "year", "month", "day", "hour", "minute", "second"]
+GAP_FACTOR = 5
+SPIKE_WINDOW = 11
+SPIKE_K = 8
+
+def qc_columns(df):
+    return [c for c in df.select_dtypes("number").columns if c not in SKIP_COLUMNS]
+
+def spike_deviation(values, spike_window=SPIKE_WINDOW):
+    # Spikes: deviation from the rolling median beyond k rolling MADs
+    series = pd.Series(values)
+    median = series.rolling(spike_window, center=True, min_periods=1).median()
+    deviation = (series - median).abs()
+    mad = deviation.rolling(spike_window, center=True, min_periods=1).median()
+    return deviation.to_numpy(), np.nan_to_num(mad.to_numpy())
+
+def spike_floor(values, deviation):
+    # Floor the MAD so flat or quantized stretches do not turn every step into a spike
+    na = np.isnan(values)
+    p1, p99 = np.nanpercentile(values, [1, 99]) if not na.all() else (0.0, 0.0)
+    return max(np.nanmedian(deviation) if not na.all() else 0.0, 1e-3 * (p99 - p1), 1e-12)
+
+def run_qc(df, ranges=RANGES, gap_factor=GAP_FACTOR, spike_window=SPIKE_WINDOW, spike_k=SPIKE_K, check_spikes=True):
+    # Returns (flags, summary); flags[i] is the OR of every check that sample i failed
+    n = len(df)
+    flags = np.zeros(n, dtype=np.uint8)
+    summary = {"n_samples": n, "channels": {}}
+
+    t = df["datetime"].to_numpy(dtype="datetime64[ns]")
+    nat = np.isnat(t)
+    flags[nat] |= FLAG_NA_TIME
+    ns = t.astype("int64")
+    dt = np.diff(ns).astype("float64") / 1e9
+    valid = ~(nat[1:] | nat[:-1])
+    step = np.median(dt[valid & (dt > 0)]) if np.any(valid & (dt > 0)) else 0.0
+    flags[1:][valid & (dt == 0)] |= FLAG_DUPLICATE
+    flags[1:][valid & (dt < 0)] |= FLAG_NONMONOTONIC
+    # A clock that jumps back about a day is a midnight rollover without a date change
+    flags[1:][valid & (np.abs(dt + 86400) < 60)] |= FLAG_DAY_WRAP
+    if step > 0:
+        flags[1:][valid & (dt > gap_factor * step)] |= FLAG_GAP
+    summary["sample_interval_s"] = float(step)
+    summary["max_gap_s"] = float(dt[valid].max()) if np.any(valid) else 0.0
+
+    for col in qc_columns(df):
+        values = df[col].to_numpy(dtype="float64")
+        na = np.isnan(values)
+        flags[na] |= FLAG_NA_VALUE
+        stats = {"na": int(na.sum())}
+        if col in ranges:
+            low, high = ranges[col]
+            out = ~na & ((values < low) | (values > high))
+            flags[out] |= FLAG_RANGE
+            stats["range"] = int(out.sum())
+        if check_spikes:
+            deviation, mad = spike_deviation(values, spike_window)
+            scale = np.maximum(mad, spike_floor(values, deviation))
+            spikes = (deviation > spike_k * 1.4826 * scale) & ~na
+            flags[spikes] |= FLAG_SPIKE
+            stats["spike"] = int(spikes.sum())
+        summary["channels"][col] = stats
+
+    summary["flags"] = {name: int(np.count_nonzero(flags & bit)) for bit, name in FLAG_NAMES.items()}
+    summary["n_flagged"] = int(np.count_nonzero(flags))
+    return flags, summary
+
+def flags_path(source, file_id):
+    return os.path.join(QC_DIR, f"{source}_{file_id}.npy")
+
+def store_qc(conn, source, file_id, df):
+    flags, summary = run_qc(df)
+    os.makedirs(QC_DIR, exist_ok=True)
+    np.save(flags_path(source, file_id), flags)
+    return store_qc_summary(conn, source, file_id, summary)
+
+def store_qc_summary(conn, source, file_id, summary):
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM qc_summary WHERE source=? AND file_id=?', (source, file_id))
+    cursor.execute('''
+        INSERT INTO qc_summary (source, file_id, n_samples, n_flagged, summary, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (source, file_id, summary["n_samples"], summary["n_flagged"], json.dumps(summary),
+          datetime.datetime.now().isoformat(timespec="seconds")))
+    conn.commit()
+    return summary
+
+def load_flags(source, file_id):
+    path = flags_path(source, file_id)
+    return np.load(path) if os.path.isfile(path) else None
+
+def qc_summary(source, file_id):
+    # Latest QC summary for a cataloged file
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT summary FROM qc_summary WHERE source = ? AND file_id = ?', (source, file_id))
+    row = cursor.fetchone()
+    conn.close()
+    return json.loads(row[0]) if row else None
+
+def describe(summary):
+    counts = ", ".join(f"{name} {count}" for name, count in summary["flags"].items() if count)
+    return f"{summary['n_flagged']} of {summary['n_samples']} samples flagged" + (f" ({counts})" if counts else "")
@@ -0,0 +1,38 @@
+import time
+import streamlit as st
+from sql_store import EXAMPLES, open_engine, run_query, tables, duckdb
+
+MAX_ROWS = 10000
+
+def sql_query():
+    st.title("SQL Query")
+    if duckdb is None:
+        st.error("The SQL page needs the duckdb package (`pip install duckdb`).")
+        return
+
+    engine = open_engine()
+    schema = tables(engine)
+    missing = [t for t in ["dat", "acc", "winch"] if t not in schema]
+    if missing:
+        st.info(f"No columnar data for {', '.join(missing)} yet. Run `python sql_store.py rebuild` to backfill.")
+    with st.expander("Tables", expanded=False):
+        for table, columns in schema.items():
+            st.markdown(f"**{table}**: " + ", ".join(f"`{name}` {dtype.lower()}" for name, dtype in columns))
+
+    example = st.selectbox("Example", ["(none)"] + list(EXAMPLES))
+    if example != "(none)":
+        st.session_state.sql_text = EXAMPLES[example].strip()
+    sql = st.text_area("SQL", key="sql_text", height=220)
+    if not st.button("Run", type="primary") or not sql.strip():
+        return
+
+    start = time.perf_counter()
+    try:
+        result, truncated = run_query(sql, MAX_ROWS, engine)
+    except Exception as e:
+        st.error(f"{type(e).__name__}: {e}")
+        return
+    st.caption(f"{len(result)} row(s) in {time.perf_counter() - start:.2f} s"
+               + (f" (first {MAX_ROWS} shown; use `python sql_store.py query` for the full result)" if truncated else ""))
+    st.dataframe(result, use_container_width=True)
+    st.download_button("Download CSV", result.to_csv(index=False), file_name="query_result.csv", mime="text/csv")
@@ -0,0 +1,173 @@
+import os
+import re
+import json
+import hashlib
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from utils import find_raw_file
+from catalog import connect, cast_files, resolve_sensor_path, overlapping_winch
+from datasets import load_sensor, load_winch, sensor_kind, winch_settings_key
+from acc_analytics import magnitude
+from figures import decimate, stacked_figure
+from cruise_summary import TENSION_COLUMNS
+import dataset_cache
+
+N_POINTS = 4000
+PANEL_HEIGHT = 220
+WIDTH = 1400
+FORMATS = ["png", "svg"]
+MANIFEST = "manifest.json"
+
+def cast_plan(cruise=None):
+    # One row per cast with its plot window: the logged deployment window from
+    # dredge_data, else the span of its sensor files recorded at ingest
+    conn = connect()
+    casts = pd.read_sql_query('''
+        SELECT s.cast_id,
+               COALESCE(MAX(d.start_date || ' ' || d.start_time), MIN(s.start_time)) AS start_time,
+               COALESCE(MAX(d.end_date || ' ' || d.end_time), MAX(s.end_time)) AS end_time
+        FROM sensor_data s LEFT JOIN dredge_data d ON d.cast_id = s.cast_id
+        WHERE ? IS NULL OR s.cruise = ?
+        GROUP BY s.cast_id
+        ORDER BY MIN(s.id)
+    ''', conn, params=(cruise, cruise))
+    conn.close()
+    return casts
+
+def output_name(cast_id):
+    return re.sub(r"[^\w.-]+", "_", str(cast_id))
+
+def cast_task(cast, out_dir, formats, n_points):
+    task = {"cast_id": cast["cast_id"], "out_dir": out_dir, "formats": formats, "n_points": n_points,
+            "files": [], "winch": [], "start": None, "end": None}
+    for file_name, file_path in cast_files(cast["cast_id"]):
+        if file_name.lower().endswith((".dat", ".acc")):
+            task["files"].append((file_name, resolve_sensor_path(file_path, file_name)))
+    start = pd.to_datetime(cast["start_time"], errors="coerce")
+    end = pd.to_datetime(cast["end_time"], errors="coerce")
+    if pd.notna(start) and pd.notna(end):
+        task["start"], task["end"] = str(start), str(end)
+        task["winch"] = list(overlapping_winch(start, end).values())
+    return task
+
+def fingerprint(task):
+    # Everything a cast's figures depend on; None when an input is missing, so
+    # the cast is always re-rendered and the failure reported
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        parts = [json.dumps([task["formats"], task["n_points"], task["start"], task["end"]])]
+        for file_name, path in task["files"]:
+            parts += [file_name, dataset_cache.file_hash(find_raw_file(path))]
+        for meta in task["winch"]:
+            raw = find_raw_file(os.path.join(meta["file_path"], meta["file_name"]))
+            parts += [meta["file_name"], dataset_cache.file_hash(raw), winch_settings_key(meta)]
+    except OSError:
+        return None
+    h.update("\0".join(parts).encode())
+    return h.hexdigest()
+
+def cast_panels(task):
+    # Standard report panels, decimated before they reach plotly
+    n_points = task["n_points"]
+    frames = {}
+    for file_name, path in task["files"]:
+        kind = sensor_kind(file_name)
+        if kind not in frames:
+            frames[kind] = load_sensor(path, kind)
+    panels = []
+    dat, acc = frames.get("dat"), frames.get("acc")
+    if dat is not None:
+        panels.append(("Pressure", decimate(dat[["datetime", "press"]], n_points), "press", 0))
+    if acc is not None:
+        acc_mag = pd.DataFrame({"datetime": acc["datetime"], "acc_mag": magnitude(acc)})
+        panels.append(("ACC magnitude", decimate(acc_mag, n_points), "acc_mag", 0))
+    if task["winch"]:
+        start, end = pd.Timestamp(task["start"]), pd.Timestamp(task["end"])
+        parts = []
+        for meta in task["winch"]:
+            df = load_winch(meta)
+            parts.append(df[(df["datetime"] >= start) & (df["datetime"] <= end)])
+        winch = decimate(pd.concat(parts, ignore_index=True).sort_values("datetime"), n_points)
+        tension = next((c for c in TENSION_COLUMNS if c in winch.columns and winch[c].notna().any()), None)
+        if tension:
+            panels.append((tension, winch, tension, 0))
+        if "Wire_out" in winch.columns:
+            panels.append(("Wire out", winch, "Wire_out", 0))
+    return panels
+
+def render_cast(task):
+    # Runs in a worker process; returns (cast_id, written paths, error)
+    try:
+        panels = cast_panels(task)
+        if not panels:
+            return task["cast_id"], [], "no plottable data"
+        fig = stacked_figure(panels, height=PANEL_HEIGHT * len(panels))
+        fig.update_layout(title=f"Cast {task['cast_id']}")
+        paths = []
+        for fmt in task["formats"]:
+            path = os.path.join(task["out_dir"], f"{output_name(task['cast_id'])}.{fmt}")
+            fig.write_image(path, format=fmt, width=WIDTH, height=PANEL_HEIGHT * len(panels))
+            paths.append(path)
+        return task["cast_id"], paths, None
+    except Exception as e:
+        traceback.print_exc()
+        return task["cast_id"], [], f"{type(e).__name__}: {e}"
+
+def load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as fh:
+        return json.load(fh)
+
+def up_to_date(entry, fp):
+    return fp is not None and entry is not None and entry["fingerprint"] == fp and \
+        all(os.path.exists(p) for p in entry["paths"])
+
+def render_cruise(cruise=None, out_dir="figures", formats=FORMATS, workers=None, n_points=N_POINTS, force=False):
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir)
+    pending = {}
+    skipped = []
+    for cast in cast_plan(cruise).to_dict("records"):
+        task = cast_task(cast, out_dir, list(formats), n_points)
+        fp = fingerprint(task)
+        if not force and up_to_date(manifest.get(str(task["cast_id"])), fp):
+            skipped.append(task["cast_id"])
+        else:
+            pending[task["cast_id"]] = (task, fp)
+
+    workers = workers or os.cpu_count() or 1
+    tasks = [task for task, _ in pending.values()]
+    if workers == 1 or len(tasks) <= 1:
+        results = [render_cast(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(render_cast, tasks))
+
+    errors = {}
+    for cast_id, paths, error in results:
+        if error:
+            errors[cast_id] = error
+            manifest.pop(str(cast_id), None)
+        else:
+            manifest[str(cast_id)] = {"fingerprint": pending[cast_id][1], "paths": paths}
+    with open(os.path.join(out_dir, MANIFEST), "w") as fh:
+        json.dump(manifest, fh, indent=1)
+    return {"rendered": [r[0] for r in results if not r[2]], "skipped": skipped, "errors": errors}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the standard per-cast figures of a cruise")
+    parser.add_argument("--cruise", help="Only casts of this cruise (default: all)")
+    parser.add_argument("--out", default="figures", help="Output directory")
+    parser.add_argument("--formats", nargs="+", default=FORMATS, choices=["png", "svg", "pdf"])
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    parser.add_argument("--points", type=int, default=N_POINTS, help="Points per trace after decimation")
+    parser.add_argument("--force", action="store_true", help="Re-render casts whose inputs are unchanged")
+    args = parser.parse_args()
+    result = render_cruise(args.cruise, args.out, args.formats, args.workers, args.points, args.force)
+    print(f"Rendered {len(result['rendered'])} cast(s), skipped {len(result['skipped'])} unchanged")
+    for cast_id, error in result["errors"].items():
+        print(f"  {cast_id}: {error}")
@@ -1,21 +1,46 @@
 import streamlit as st
 import sqlite3
 import os
+from utils import COMPRESSIONS, save_raw
+from catalog import existing_path, registered_file, record_file_stats
+from jobs import submit, job_panel
+
+SOURCE_MODES = ["Upload file", "Register existing path"]
 
 def staroddi_import():
     st.title("Star-Oddi File Ingestion")
 
-    uploaded_file = st.file_uploader("Select Star-Oddi file", key="staroddi_file")
+    # Registering catalogs a file on shared storage where it is; nothing is copied
+    mode = st.radio("Source", SOURCE_MODES, horizontal=True, key="staroddi_mode")
+    if mode == "Upload file":
+        uploaded_file = st.file_uploader("Select Star-Oddi file", key="staroddi_file")
+    else:
+        path_input = st.text_input("Path of the file on shared storage", key="staroddi_path")
     cruise = st.text_input("Enter cruise")
     cast_id = st.text_input("Enter cast_id")
-
-    if st.button("Upload and Save"):
-        if uploaded_file and cruise and cast_id:
-            # Save file
-            file_path = os.path.join("sensor_data", uploaded_file.name)
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-
+    if mode == "Upload file":
+        compression = st.selectbox("Storage compression", COMPRESSIONS)
+
+    if st.button("Upload and Save" if mode == "Upload file" else "Register"):
+        if not (cruise and cast_id):
+            st.error("Please enter cruise and cast_id.")
+        elif mode == "Upload file" and not uploaded_file:
+            st.error("Please select a file.")
+        else:
+            if mode == "Upload file":
+                # Save file
+                uploaded_file.seek(0)
+                file_path = save_raw(uploaded_file, os.path.join("sensor_data", uploaded_file.name), compression)
+                file_name = uploaded_file.name
+            else:
+                try:
+                    file_path = existing_path(path_input)
+                except ValueError as e:
+                    st.error(str(e))
+                    return
+                file_name = os.path.basename(file_path)
+                if registered_file("sensor", file_path) is not None:
+                    st.warning(f"{file_path} is already registered; adding another catalog entry.")
 
             # Add record to SQLite database
             conn = sqlite3.connect("dredge_remote.db")
@@ -23,12 +48,16 @@ def staroddi_import():
             cursor.execute('''
                 INSERT INTO sensor_data (file_path, file_name, cruise, cast_id)
                 VALUES (?, ?, ?, ?)
-            ''', (file_path, uploaded_file.name, cruise, cast_id))
+            ''', (file_path, file_name, cruise, cast_id))
+            file_id = cursor.lastrowid
             conn.commit()
+            record_file_stats(conn, "sensor", file_id, file_path, in_place=mode != "Upload file")
             conn.close()
 
-            st.success("File uploaded and record added to database.")
-        else:
-            st.error("Please select a file and enter cruise and cast_id.")
-
+            job_id = submit("sensor_ingest", {"file_id": file_id})
+            if mode == "Upload file":
+                st.success(f"File uploaded and record added to database; ingest job #{job_id} queued.")
+            else:
+                st.success(f"Registered {file_path} in place; ingest job #{job_id} queued.")
 
+    job_panel()
@@ -1,7 +1,17 @@
+import importlib
 import streamlit as st
-from w_import import w_import
-from so_import import staroddi_import
-from plot_wso import sayhi
+import dataset_cache
+
+# Menu entry -> (module, page function). Pages are imported on first selection so
+# the import pages never load the plotting stack.
+PAGES = {
+    "Plot": ("plot_wso", "sayhi"),
+    "Compare Casts": ("compare_casts", "compare_casts"),
+    "Cruise Overview": ("cruise_overview", "cruise_overview"),
+    "SQL Query": ("query_page", "sql_query"),
+    "Import Winch Data": ("w_import", "w_import"),
+    "Import Star-Oddi Data": ("so_import", "staroddi_import"),
+}
 
 # Force wide layout for Streamlit
 st.set_page_config(layout="wide")
@@ -28,13 +38,17 @@ st.markdown(
 )
 
 # Sidebar navigation
-menu = ["Plot", "Import Winch Data", "Import Star-Oddi Data"]  # Add the new page to the menu
+menu = list(PAGES)
 choice = st.sidebar.radio("Select Option", menu)
 
 # Render the selected page
-if choice == "Plot":
-    sayhi()
-elif choice == "Import Winch Data":
-    w_import()
-elif choice == "Import Star-Oddi Data":
-    staroddi_import()
\ No newline at end of file
+module_name, page_name = PAGES[choice]
+getattr(importlib.import_module(module_name), page_name)()
+
+# Shared dataset cache usage across all sessions on this server
+with st.sidebar.expander("Dataset cache", expanded=False):
+    stats = dataset_cache.stats()
+    st.progress(min(1.0, stats["bytes"] / stats["budget"]),
+                text=f"{stats['bytes'] / 1e6:.0f} / {stats['budget'] / 1e6:.0f} MB in {stats['entries']} dataset(s)")
+    st.caption(f"Hits {stats['hits']}, misses {stats['misses']}, evictions {stats['evictions']}, "
+               f"too large to cache {stats['oversize']}")
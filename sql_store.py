@@ -0,0 +1,178 @@
+import os
+import sys
+import glob
+import time
+import json
+import argparse
+import pandas as pd
+from utils import parse_winch_dat, find_raw_file
+from catalog import connect, resolve_sensor_path
+from aggregates import parse_sensor_file
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# Columnar copy of every parsed file, one Parquet file per cataloged file under a
+# hive-style file_id=<id> directory, queried with DuckDB next to the SQLite catalog.
+# Parquet row-group statistics and the file_id partitions let DuckDB skip files and
+# row groups a query does not need and read only the columns it references.
+
+STORE_DIR = "parquet"
+ROW_GROUP_SIZE = 256 * 1024
+DATA_TABLES = ["dat", "acc", "winch"]
+CATALOG_TABLES = ["sensor_data", "winch_data", "dredge_data", "cast_summary"]
+
+EXAMPLES = {
+    "Casts per cruise": '''
+SELECT cruise, count(*) AS casts, min(start_time) AS first_cast, max(end_time) AS last_cast
+FROM casts GROUP BY cruise ORDER BY cruise''',
+    "Deepest casts": '''
+SELECT s.cast_id, s.cruise, max(d.press) AS max_press
+FROM dat d JOIN sensor_data s ON d.file_id = s.id
+GROUP BY ALL ORDER BY max_press DESC LIMIT 20''',
+    "High tension while ACC spiked": '''
+WITH tension AS (
+    SELECT c.cast_id, date_trunc('minute', w.datetime) AS minute, max(w.Tension) AS max_tension
+    FROM winch w JOIN casts c ON w.datetime BETWEEN c.start_time AND c.end_time
+    WHERE w.Tension > 8
+    GROUP BY ALL
+), spikes AS (
+    SELECT s.cast_id, date_trunc('minute', a.datetime) AS minute,
+           max(sqrt(a.x_acc ^ 2 + a.y_acc ^ 2 + a.z_acc ^ 2)) AS peak_acc
+    FROM acc a JOIN sensor_data s ON a.file_id = s.id
+    GROUP BY ALL HAVING peak_acc > 3
+)
+SELECT cast_id, count(*) AS minutes, max(max_tension) AS max_tension, max(peak_acc) AS peak_acc
+FROM tension JOIN spikes USING (cast_id, minute)
+GROUP BY cast_id ORDER BY minutes DESC''',
+}
+
+def table_for(source, file_name):
+    if source == "winch":
+        return "winch"
+    return "acc" if file_name.lower().endswith(".acc") else "dat"
+
+def parquet_path(table, file_id):
+    return os.path.join(STORE_DIR, table, f"file_id={file_id}", "data.parquet")
+
+def store_parquet(table, file_id, df):
+    path = parquet_path(table, file_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    df.to_parquet(tmp, index=False, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp, path)
+    return path
+
+def is_current(table, file_id, raw_path):
+    path = parquet_path(table, file_id)
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(raw_path)
+
+def rebuild_all(force=False):
+    # Backfill the columnar store for every cataloged file that is missing or stale
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, file_name, file_path FROM sensor_data')
+    for file_id, file_name, file_path in cursor.fetchall():
+        if not file_name.lower().endswith((".dat", ".acc")):
+            continue
+        path = find_raw_file(resolve_sensor_path(file_path, file_name))
+        table = table_for("sensor", file_name)
+        if force or not is_current(table, file_id, path):
+            df = parse_sensor_file(path, file_name)
+            store_parquet(table, file_id, df)
+            print(f"{table} {file_name}: {len(df)} rows")
+    cursor.execute('SELECT id, file_name, file_path, settings FROM winch_data')
+    for file_id, file_name, file_path, settings_json in cursor.fetchall():
+        meta = json.loads(settings_json)
+        meta['file_name'] = file_name
+        meta['file_path'] = file_path
+        if force or not is_current("winch", file_id, find_raw_file(os.path.join(file_path, file_name))):
+            df = parse_winch_dat(file_name, meta)
+            store_parquet("winch", file_id, df)
+            print(f"winch {file_name}: {len(df)} rows")
+    conn.close()
+
+def open_engine():
+    # In-memory DuckDB session: catalog tables copied from SQLite (they are small),
+    # parsed data as views over the Parquet store
+    if duckdb is None:
+        raise RuntimeError("SQL queries need the duckdb package")
+    engine = duckdb.connect()
+    conn = connect()
+    for table in CATALOG_TABLES:
+        engine.register(table, pd.read_sql_query(f'SELECT * FROM {table}', conn))
+    conn.close()
+    engine.execute('''
+        CREATE VIEW casts AS
+        SELECT cast_id, any_value(cruise) AS cruise,
+               min(TRY_CAST(start_time AS TIMESTAMP)) AS start_time,
+               max(TRY_CAST(end_time AS TIMESTAMP)) AS end_time
+        FROM sensor_data GROUP BY cast_id
+    ''')
+    for table in DATA_TABLES:
+        pattern = os.path.join(STORE_DIR, table, "*", "*.parquet")
+        if glob.glob(pattern):
+            engine.execute(f'''
+                CREATE VIEW {table} AS SELECT * FROM read_parquet('{pattern}', hive_partitioning = true,
+                                                                  union_by_name = true)
+            ''')
+    # Queries come from the app's users: only the Parquet store stays readable, and the
+    # setting cannot be switched back from a query
+    store = os.path.abspath(STORE_DIR).replace("'", "''")
+    engine.execute(f"SET allowed_directories = ['{store}{os.sep}']")
+    engine.execute("SET enable_external_access = false")
+    engine.execute("SET lock_configuration = true")
+    return engine
+
+def tables(engine):
+    # Table or view name -> list of (column, type)
+    described = engine.execute('''
+        SELECT table_name, column_name, data_type FROM information_schema.columns
+        ORDER BY table_name, ordinal_position
+    ''').fetchall()
+    schema = {}
+    for table, column, dtype in described:
+        schema.setdefault(table, []).append((column, dtype))
+    return schema
+
+READ_ONLY_STATEMENTS = ["SELECT", "EXPLAIN"]
+
+def run_query(sql, limit=None, engine=None):
+    # Returns (DataFrame, truncated). One read-only statement only: allowed_directories
+    # would still let COPY write into the store
+    statements = duckdb.extract_statements(sql) if duckdb is not None else []
+    if len(statements) != 1 or statements[0].type.name not in READ_ONLY_STATEMENTS:
+        raise ValueError("Only a single SELECT query can be run")
+    engine = engine or open_engine()
+    relation = engine.sql(sql)
+    if relation is None:
+        return pd.DataFrame(), False
+    if limit is None:
+        return relation.df(), False
+    df = relation.limit(limit + 1).df()
+    return df.iloc[:limit], len(df) > limit
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQL over the parsed data store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("rebuild", help="Write Parquet copies of new or changed files")
+    rebuild.add_argument("--force", action="store_true", help="Rewrite every file")
+    query = commands.add_parser("query", help="Run a query and print or save the result")
+    query.add_argument("sql", help="SQL text, or @path to read it from a file")
+    query.add_argument("--out", help="Save the result (.csv or .parquet) instead of printing it")
+    args = parser.parse_args()
+    if args.command == "rebuild":
+        rebuild_all(args.force)
+        sys.exit()
+    sql = open(args.sql[1:]).read() if args.sql.startswith("@") else args.sql
+    start = time.perf_counter()
+    result, _ = run_query(sql)
+    print(f"{len(result)} row(s) in {time.perf_counter() - start:.2f} s", file=sys.stderr)
+    if args.out and args.out.endswith(".parquet"):
+        result.to_parquet(args.out, index=False)
+    elif args.out:
+        result.to_csv(args.out, index=False)
+    else:
+        print(result.to_string(index=False))
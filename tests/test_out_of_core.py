@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+import pytest
+from out_of_core import envelope
+
+
+@pytest.mark.parametrize("days", [4.6, 6.5, 11.6])
+def test_envelope_bins_long_records(days):
+    # 1 Hz record; min/max of each bin must come from the rows inside that bin
+    n = int(days * 86400)
+    start = pd.Timestamp("2022-08-09")
+    times = start + pd.to_timedelta(np.arange(n), unit="s")
+    values = np.arange(n, dtype="float64")
+    df = pd.DataFrame({"datetime": times, "value": values})
+    n_bins = 20000
+    frames = [df.iloc[i:i + n // 7 + 1] for i in range(0, n, n // 7 + 1)]
+    out = envelope(frames, times[0], times[-1], n_bins)
+
+    lo, hi = out.iloc[0::2], out.iloc[1::2]
+    assert len(lo) == len(hi) == n_bins
+    assert lo["value"].min() == 0 and hi["value"].max() == n - 1
+    # Values equal seconds since start, so a bin's minimum is its first row at or after the edge
+    edges = (lo["datetime"] - start).dt.total_seconds().to_numpy()
+    assert np.array_equal(lo["value"].to_numpy(), np.ceil(edges))
+    assert np.all(hi["value"].to_numpy()[:-1] < edges[1:])
+    assert np.all(np.diff(out["datetime"].to_numpy()) > np.timedelta64(0))
@@ -0,0 +1,22 @@
+import io
+import pandas as pd
+import pytest
+from parser_backends import read_table, available_backends
+from utils import datetime_from_code
+
+SAMPLE = b"".join(
+    f"2022-08-09 12:00:{i % 60:02d} {i} {i * 0.5:.1f} 2.{i % 10}\n".encode() for i in range(200)
+)
+COLUMNS = ["date", "time", "Winch", "Wire_out", "Tension"]
+CODE = "pd.to_datetime(df['date'] + ' ' + df['time'])"
+
+
+@pytest.mark.skipif("pyarrow" not in available_backends(), reason="pyarrow not installed")
+def test_pyarrow_matches_pandas_column_types():
+    frames = {}
+    for name in ["pandas", "pyarrow"]:
+        df = read_table(lambda: io.BytesIO(SAMPLE), " ", 0, COLUMNS, name)
+        df["datetime"] = datetime_from_code(df, CODE)
+        frames[name] = df
+    assert list(frames["pyarrow"].dtypes.astype(str)) == list(frames["pandas"].dtypes.astype(str))
+    pd.testing.assert_series_equal(frames["pyarrow"]["datetime"], frames["pandas"]["datetime"])
@@ -0,0 +1,38 @@
+import pandas as pd
+from time_index import build_index, parse_window, sensor_parser, winch_parser
+
+COLUMNS = ["year", "month", "day", "hour", "minute", "second", "Tension"]
+
+
+def test_parse_window_keeps_duplicates_of_start_across_index_points(tmp_path):
+    # 4 Hz samples with whole-second timestamps: every second repeats four times
+    path = tmp_path / "winch.dat"
+    with open(path, "w") as f:
+        for i in range(400):
+            t = pd.Timestamp("2022-08-09 12:00:00") + pd.Timedelta(seconds=i // 4)
+            f.write(f"{t.year} {t.month} {t.day} {t.hour} {t.minute} {t.second} {i}\n")
+    parse = winch_parser({"delimiter": r"\s+", "columns": COLUMNS})
+    offsets, times, size = build_index(str(path), parse, 0, every=6)
+    full = parse(path.read_bytes())
+    for second in range(0, 100, 7):
+        start = pd.Timestamp("2022-08-09 12:00:00") + pd.Timedelta(seconds=second)
+        end = start + pd.Timedelta(seconds=3)
+        window = parse_window(str(path), parse, offsets, times, size, start, end)
+        expected = full[(full["datetime"] >= start) & (full["datetime"] <= end)].reset_index(drop=True)
+        pd.testing.assert_frame_equal(window, expected)
+
+
+def test_parse_window_outside_the_record(tmp_path):
+    path = tmp_path / "c1.dat"
+    with open(path, "w", encoding="latin1") as f:
+        f.write("#0\tDate & Time:\t09.08.2022\n#1\tColumns:\t8\n")
+        for i in range(300):
+            t = pd.Timestamp("2022-08-09 12:00:00") + pd.Timedelta(seconds=i)
+            f.write(f"{i + 1}\t{t:%d.%m.%Y %H:%M:%S},000\t3,96\t0,13\t-1,38\t-6,20\t-4,04\t1,00\t0,00\n")
+    parse = sensor_parser("c1.dat")
+    offsets, times, size = build_index(str(path), parse, 2, every=25)
+    columns = list(parse(path.read_bytes()).columns)
+    for start, end in [("2022-08-09 11:00", "2022-08-09 11:59"), ("2022-08-09 13:00", "2022-08-09 14:00")]:
+        window = parse_window(str(path), parse, offsets, times, size, pd.Timestamp(start), pd.Timestamp(end))
+        assert len(window) == 0
+        assert list(window.columns) == columns
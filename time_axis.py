@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+# Compact time axis for regularly sampled logs. Regular stretches are stored as
+# (start, step, count) segments; gaps, jitter and NaT rows fall back to explicit
+# segments whose timestamps live in one int64 array. An axis is a plain dict of arrays:
+#   first  row position where each segment starts
+#   start  first timestamp (ns) of a regular segment, or its offset into `explicit`
+#   step   interval (ns) of a regular segment, EXPLICIT for explicit segments
+#   count  rows in the segment
+#   time0  timestamp (ns) of the segment's first row, for binary search
+# plus n (rows), offset (ns added on read, so shifting is O(1)) and monotonic.
+
+EXPLICIT = -1
+MIN_RUN = 3  # shorter regular stretches are cheaper stored explicitly
+NAT = np.iinfo(np.int64).min
+
+def _segments(t):
+    # Greedy left-to-right cover of t by regular runs of >= MIN_RUN equally spaced,
+    # increasing timestamps; everything between runs becomes explicit
+    d = np.diff(t)
+    valid = (t[:-1] != NAT) & (t[1:] != NAT) & (d > 0)
+    d = np.where(valid, d, 0)
+    change = np.flatnonzero(d[1:] != d[:-1]) + 1
+    if len(change) > len(t) // 8:
+        return [(0, EXPLICIT, len(t))]  # jittery clock: nothing to gain, skip the scan
+    run_starts = np.concatenate([[0], change])
+    run_ends = np.concatenate([change, [len(d)]])  # d[run_start:run_end] share one value
+    segments = []
+    pos = 0
+    for s, e in zip(run_starts.tolist(), run_ends.tolist()):
+        step = int(d[s])
+        if step <= 0:
+            continue
+        first = max(s, pos)
+        last = e  # element e closes the last interval d[e - 1]
+        if last - first + 1 < MIN_RUN:
+            continue
+        if first > pos:
+            segments.append((pos, EXPLICIT, first - pos))
+        segments.append((first, step, last - first + 1))
+        pos = last + 1
+    if pos < len(t):
+        segments.append((pos, EXPLICIT, len(t) - pos))
+    return segments
+
+def from_times(times):
+    # times: anything pandas can view as datetime64[ns] (Series, DatetimeIndex, array)
+    t = pd.DatetimeIndex(times).as_unit("ns").asi8 if len(times) else np.array([], dtype=np.int64)
+    segments = _segments(t) if len(t) > 1 else ([(0, EXPLICIT, len(t))] if len(t) else [])
+    first = np.array([s[0] for s in segments], dtype=np.int64)
+    step = np.array([s[1] for s in segments], dtype=np.int64)
+    count = np.array([s[2] for s in segments], dtype=np.int64)
+    explicit_rows = [t[f:f + c] for f, s, c in segments if s == EXPLICIT]
+    explicit = np.concatenate(explicit_rows) if explicit_rows else np.array([], dtype=np.int64)
+    start = t[first] if len(first) else np.array([], dtype=np.int64)
+    if explicit_rows:
+        sizes = np.array([len(rows) for rows in explicit_rows], dtype=np.int64)
+        start = start.copy()
+        start[step == EXPLICIT] = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    filled = t[t != NAT]
+    return {"first": first, "start": start, "step": step, "count": count, "explicit": explicit,
+            "time0": t[first] if len(first) else np.array([], dtype=np.int64),
+            "n": len(t), "offset": 0, "monotonic": bool(np.all(np.diff(filled) >= 0)) and len(filled) == len(t)}
+
+def nbytes(axis):
+    return sum(axis[k].nbytes for k in ["first", "start", "step", "count", "explicit", "time0"])
+
+def is_compact(axis, ratio=0.25):
+    # Worth keeping instead of the explicit column
+    return nbytes(axis) <= ratio * 8 * max(axis["n"], 1)
+
+def shift(axis, offset):
+    # Same axis read `offset` (Timedelta, or seconds) later
+    if not isinstance(offset, pd.Timedelta):
+        offset = pd.to_timedelta(offset, unit="s")
+    return dict(axis, offset=axis["offset"] + offset.value)
+
+def to_numpy(axis):
+    # datetime64[ns] values, materialized
+    out = np.empty(axis["n"], dtype=np.int64)
+    for first, start, step, count in zip(axis["first"].tolist(), axis["start"].tolist(),
+                                         axis["step"].tolist(), axis["count"].tolist()):
+        if step == EXPLICIT:
+            out[first:first + count] = axis["explicit"][start:start + count]
+        else:
+            out[first:first + count] = start + step * np.arange(count, dtype=np.int64)
+    if axis["offset"]:
+        out[out != NAT] += axis["offset"]
+    return out.view("datetime64[ns]")
+
+def to_index(axis, name="datetime"):
+    return pd.DatetimeIndex(to_numpy(axis), name=name)
+
+def _time_at(axis, i, row):
+    # Timestamp (ns, without offset) of `row` inside segment i
+    first, start, step = axis["first"][i], axis["start"][i], axis["step"][i]
+    if step == EXPLICIT:
+        return axis["explicit"][start + row - first]
+    return start + step * (row - first)
+
+def locate(axis, when, side="left"):
+    # searchsorted on a monotonic axis without materializing it: binary search over
+    # segment starts, then arithmetic inside a regular segment
+    if not axis["monotonic"]:
+        raise ValueError("locate needs a time-ordered axis")
+    if not axis["n"]:
+        return 0
+    t = pd.Timestamp(when).as_unit("ns").value - axis["offset"]
+    i = int(np.searchsorted(axis["time0"], t, side=side)) - 1
+    if i < 0:
+        return 0
+    first, start, step, count = (int(axis[k][i]) for k in ["first", "start", "step", "count"])
+    if step == EXPLICIT:
+        return first + int(np.searchsorted(axis["explicit"][start:start + count], t, side=side))
+    k = -((start - t) // step) if side == "left" else (t - start) // step + 1
+    return first + min(max(k, 0), count)
+
+def window(axis, start, end):
+    # Row slice covering start <= time <= end
+    return slice(locate(axis, start, "left"), locate(axis, end, "right"))
+
+def time_range(axis):
+    if not axis["n"]:
+        return pd.NaT, pd.NaT
+    if axis["monotonic"]:
+        first = _time_at(axis, 0, 0)
+        last = _time_at(axis, len(axis["first"]) - 1, axis["n"] - 1)
+        return pd.Timestamp(first + axis["offset"]), pd.Timestamp(last + axis["offset"])
+    values = pd.Series(to_numpy(axis))
+    return values.min(), values.max()
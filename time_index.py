@@ -0,0 +1,179 @@
+import io
+import os
+import sys
+import mmap
+import numpy as np
+import pandas as pd
+from utils import (
+    parse_staroddi_dat,
+    parse_acc_file,
+    datetime_from_code,
+    find_raw_file,
+    open_raw,
+    GZIP_MAGIC,
+    ZSTD_MAGIC
+)
+from parser_backends import read_table
+from catalog import connect, winch_meta, sensor_file
+
+INDEX_EVERY = 1000
+BLOCK_SIZE = 16 * 1024 * 1024
+
+def is_compressed(path):
+    with open(path, "rb") as fh:
+        magic = fh.read(4)
+    return magic[:2] == GZIP_MAGIC or magic == ZSTD_MAGIC
+
+def sensor_first_line(path):
+    # Star-Oddi headers end at the first line that starts with a digit
+    with open_raw(path) as fh:
+        for i, line in enumerate(fh):
+            if line[:1].isdigit():
+                return i
+    return 0
+
+def sampled_line_offsets(path, first_line, every):
+    # Byte offset of every `every`-th line from first_line on, found block-wise
+    # with NumPy so only the sampled offsets are ever held in memory
+    offsets = [np.array([0], dtype=np.int64)] if first_line == 0 else []
+    line_no = 0
+    base = 0
+    with open(path, "rb") as fh:
+        while True:
+            block = fh.read(BLOCK_SIZE)
+            if not block:
+                break
+            newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10)
+            numbers = line_no + 1 + np.arange(len(newlines))
+            keep = (numbers >= first_line) & ((numbers - first_line) % every == 0)
+            offsets.append(newlines[keep].astype(np.int64) + base + 1)
+            line_no += len(newlines)
+            base += len(block)
+    offsets = np.concatenate(offsets) if offsets else np.array([], dtype=np.int64)
+    return offsets[offsets < base], base
+
+def sensor_parser(file_name):
+    parser = parse_acc_file if file_name.lower().endswith(".acc") else parse_staroddi_dat
+    return lambda data: parser(io.BytesIO(data))
+
+def winch_parser(meta):
+    def parse(data):
+        df = read_table(lambda: io.BytesIO(data), meta["delimiter"], 0, meta["columns"], meta.get("parser", "auto"))
+        df["datetime"] = datetime_from_code(df, meta.get("datetime_code"))
+        return df
+    return parse
+
+def iter_chunks(path, parse_bytes, skip_lines=0, chunk_bytes=BLOCK_SIZE):
+    # Parsed frames of consecutive whole-line blocks of a raw (possibly compressed)
+    # file, so memory stays around one block and its frame
+    with open_raw(path) as fh:
+        for _ in range(skip_lines):
+            fh.readline()
+        rest = b""
+        while True:
+            block = fh.read(chunk_bytes)
+            if not block:
+                break
+            block = rest + block
+            cut = block.rfind(b"\n") + 1
+            rest = block[cut:]
+            if block[:cut].strip():
+                yield parse_bytes(block[:cut])
+        if rest.strip():
+            yield parse_bytes(rest)
+
+def _mmap(fh):
+    return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+def build_index(path, parse_bytes, first_line, every=INDEX_EVERY):
+    offsets, size = sampled_line_offsets(path, first_line, every)
+    with open(path, "rb") as fh, _mmap(fh) as mm:
+        lines = []
+        for offset in offsets:
+            end = mm.find(b"\n", offset)
+            lines.append(mm[offset:end if end >= 0 else size].rstrip(b"\r"))
+    # Blank trailing lines carry no timestamp
+    filled = np.array([bool(line.strip()) for line in lines], dtype=bool)
+    offsets = offsets[filled]
+    lines = [line for line in lines if line.strip()]
+    times = parse_bytes(b"\n".join(lines) + b"\n")["datetime"].to_numpy(dtype="datetime64[ns]")
+    if len(times) != len(offsets):
+        raise ValueError(f"Indexed {len(offsets)} lines but parsed {len(times)} timestamps in {path}")
+    # Unparseable sampled lines borrow a neighbour's time so every offset stays usable
+    times = pd.Series(times).ffill().bfill().to_numpy(dtype="datetime64[ns]")
+    return offsets, times.astype("int64"), size
+
+def _source_info(source, file_id):
+    # (raw path, byte parser, first data line) for a cataloged file
+    if source == "winch":
+        meta = winch_meta(file_id)
+        path = find_raw_file(os.path.join(meta["file_path"], meta["file_name"]))
+        return path, winch_parser(meta), int(meta["header_lines"])
+    file_name, path = sensor_file(file_id)
+    path = find_raw_file(path)
+    return path, sensor_parser(file_name), sensor_first_line(path)
+
+def store_index(conn, source, file_id, every=INDEX_EVERY):
+    path, parse_bytes, first_line = _source_info(source, file_id)
+    if is_compressed(path):
+        return None
+    offsets, times, size = build_index(path, parse_bytes, first_line, every)
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM time_index WHERE source=? AND file_id=?', (source, file_id))
+    cursor.execute('''
+        INSERT INTO time_index (source, file_id, every, file_size, mtime, monotonic, offsets, times)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (source, file_id, every, size, os.path.getmtime(path),
+          int(bool(np.all(np.diff(times) >= 0))), offsets.tobytes(), times.tobytes()))
+    conn.commit()
+    return len(offsets)
+
+def load_index(source, file_id):
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT file_size, mtime, monotonic, offsets, times FROM time_index WHERE source=? AND file_id=?
+    ''', (source, file_id))
+    row = cursor.fetchone()
+    conn.close()
+    if row is None:
+        return None
+    size, mtime, monotonic, offsets, times = row
+    return {"file_size": size, "mtime": mtime, "monotonic": bool(monotonic),
+            "offsets": np.frombuffer(offsets, dtype=np.int64), "times": np.frombuffer(times, dtype=np.int64)}
+
+def read_window(source, file_id, start, end):
+    # Parse only the bytes covering [start, end]; None when the file has no usable
+    # index (compressed, replaced since indexing, or not time-ordered)
+    index = load_index(source, file_id)
+    if index is None or not index["monotonic"] or not len(index["offsets"]):
+        return None
+    path, parse_bytes, _ = _source_info(source, file_id)
+    if os.path.getsize(path) != index["file_size"] or os.path.getmtime(path) != index["mtime"]:
+        return None
+    return parse_window(path, parse_bytes, index["offsets"], index["times"], index["file_size"], start, end)
+
+def parse_window(path, parse_bytes, offsets, times, size, start, end):
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    # Last index point before start: rows equal to start may sit on both sides of a point
+    lo = max(0, np.searchsorted(times, start.value, side="left") - 1)
+    hi = np.searchsorted(times, end.value, side="right")
+    with open(path, "rb") as fh, _mmap(fh) as mm:
+        data = mm[offsets[lo]:offsets[hi] if hi < len(offsets) else size]
+        if not data.strip():
+            # Window before the record: no rows, but the columns of the first indexed block
+            return parse_bytes(mm[offsets[0]:offsets[1] if len(offsets) > 1 else size]).iloc[:0]
+    df = parse_bytes(data)
+    mask = (df["datetime"] >= start) & (df["datetime"] <= end)
+    return df.loc[mask].reset_index(drop=True)
+
+if __name__ == "__main__":
+    # python time_index.py <sensor|winch> <file_id> <start> <end> [out.csv]
+    source, file_id, start, end = sys.argv[1], int(sys.argv[2]), sys.argv[3], sys.argv[4]
+    window = read_window(source, file_id, start, end)
+    if window is None:
+        sys.exit(f"No usable time index for {source} file {file_id}")
+    if len(sys.argv) > 5:
+        window.to_csv(sys.argv[5], index=False)
+    else:
+        print(window)
@@ -1,7 +1,142 @@
+import numpy as np
 import pandas as pd
 import io
 import os
 import json
+import gzip
+import shutil
+from parser_backends import read_table
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+COMPRESSIONS = ["none", "gzip"] + (["zstd"] if zstandard is not None else [])
+
+def find_raw_file(path):
+    # Raw files may have been stored compressed under a suffixed name
+    if os.path.isfile(path):
+        return path
+    for suffix in COMPRESSION_SUFFIXES.values():
+        if os.path.isfile(path + suffix):
+            return path + suffix
+    return path
+
+def open_raw(path):
+    # Open a raw instrument file as a binary stream, decompressing on the fly
+    fh = open(find_raw_file(path), "rb")
+    magic = fh.read(4)
+    fh.seek(0)
+    if magic[:2] == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=fh, mode="rb")
+    if magic == ZSTD_MAGIC:
+        if zstandard is None:
+            fh.close()
+            raise RuntimeError(f"{path} is zstd-compressed but the zstandard package is not installed")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(fh, closefd=True))
+    return fh
+
+def save_raw(src, path, compression="none"):
+    # Stream an uploaded file to disk, optionally compressed; returns the written path
+    if compression == "none":
+        with open(path, "wb") as out:
+            shutil.copyfileobj(src, out)
+        return path
+    path = path + COMPRESSION_SUFFIXES[compression]
+    with open(path, "wb") as out:
+        if compression == "gzip":
+            with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=6) as writer:
+                shutil.copyfileobj(src, writer)
+        elif compression == "zstd":
+            if zstandard is None:
+                raise RuntimeError("zstd compression requested but the zstandard package is not installed")
+            with zstandard.ZstdCompressor(level=3).stream_writer(out, closefd=False) as writer:
+                shutil.copyfileobj(src, writer)
+        else:
+            raise ValueError(f"Unknown compression: {compression}")
+    return path
+
+STARODDI_TIME_FORMAT = "%d.%m.%Y %H:%M:%S.%f"
+STARODDI_TIME_WIDTH = 23  # dd.mm.yyyy HH:MM:SS,fff
+# Byte positions of the fields; the loggers write "." or "," for the dots
+TIME_FIELDS = {"day": [0, 1], "month": [3, 4], "year": [6, 7, 8, 9], "hour": [11, 12], "minute": [14, 15],
+               "second": [17, 18], "ms": [20, 21, 22]}
+TIME_SEPARATORS = {2: b".,", 5: b".,", 10: b" ", 13: b":", 16: b":", 19: b".,"}
+
+def _fixed_width_rows(values, width):
+    # (rows x width uint8 matrix, mask of rows that are strings of exactly `width` bytes);
+    # matrix rows outside the mask are unspecified
+    n = len(values)
+    if pyarrow is not None:
+        arr = pyarrow.array(values, type=pyarrow.large_string(), from_pandas=True)
+        arr = arr.combine_chunks() if isinstance(arr, pyarrow.ChunkedArray) else arr
+        _, offsets, data = arr.buffers()
+        offsets = np.frombuffer(offsets, dtype=np.int64, count=n + 1, offset=arr.offset * 8)
+        data = np.frombuffer(data, dtype=np.uint8) if data is not None else np.zeros(0, dtype=np.uint8)
+        ok = np.diff(offsets) == width
+        if arr.null_count:
+            ok &= ~np.asarray(arr.is_null(), dtype=bool)
+        if ok.all() and offsets[-1] - offsets[0] == n * width:
+            return data[offsets[0]:offsets[-1]].reshape(n, width), ok
+        if len(data) < width:
+            return np.zeros((n, width), dtype=np.uint8), np.zeros(n, dtype=bool)
+        # Each row start picks one width-byte window of the data buffer
+        windows = np.lib.stride_tricks.sliding_window_view(data, width)
+        return windows[np.where(ok, offsets[:-1], 0)], ok
+    strings = np.asarray(values, dtype=object).astype(f"S{width + 1}")
+    rows = strings.view(np.uint8).reshape(n, width + 1)
+    return rows[:, :width], (rows[:, width - 1] != 0) & (rows[:, width] == 0)
+
+def parse_staroddi_times(values):
+    # Format-based path, one Python string at a time
+    values = pd.Series(values).astype(str).str.replace(",", ".", regex=False)
+    times = pd.to_datetime(values, format=STARODDI_TIME_FORMAT, errors="coerce")
+    # Newer pandas may pick a coarser unit; dates outside the nanosecond range become NaT
+    times = times.where((times >= pd.Timestamp.min) & (times <= pd.Timestamp.max))
+    return times.astype("datetime64[ns]")
+
+def decode_staroddi_times(values):
+    # Star-Oddi timestamps to datetime64[ns]. Well-formed fixed-width rows are decoded
+    # from their bytes with integer arithmetic; anything else (other widths, bad digits,
+    # impossible dates, missing values) goes through the format-based path
+    values = pd.Series(values)
+    n = len(values)
+    try:
+        rows, ok = _fixed_width_rows(values, STARODDI_TIME_WIDTH)
+    except (TypeError, ValueError):
+        rows, ok = np.zeros((n, STARODDI_TIME_WIDTH), dtype=np.uint8), np.zeros(n, dtype=bool)
+    for p, allowed in TIME_SEPARATORS.items():
+        column = rows[:, p]
+        ok &= np.logical_or.reduce([column == c for c in allowed])
+    f = {}
+    for name, positions in TIME_FIELDS.items():
+        f[name] = np.zeros(n, dtype=np.int32)
+        for p in positions:
+            digit = rows[:, p] - np.uint8(ord("0"))  # wraps around, so non-digits end up above 9
+            ok &= digit <= 9
+            f[name] *= 10
+            f[name] += digit
+    months = (f["year"] - 1970) * 12 + f["month"] - 1
+    month_start = months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    month_days = (months + 1).astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) - month_start
+    ok &= ((f["month"] >= 1) & (f["month"] <= 12) & (f["day"] >= 1) & (f["day"] <= month_days)
+           & (f["hour"] <= 23) & (f["minute"] <= 59) & (f["second"] <= 59)
+           & (f["year"] >= 1678) & (f["year"] <= 2261))  # datetime64[ns] range
+    seconds = (((month_start + f["day"] - 1) * 24 + f["hour"]) * 60 + f["minute"]) * 60 + f["second"]
+    ns = (seconds * 1000 + f["ms"]) * 10 ** 6
+    out = np.where(ok, ns, np.iinfo(np.int64).min).view("datetime64[ns]")
+    if not ok.all():
+        out[~ok] = parse_staroddi_times(values[~ok]).to_numpy()
+    return pd.Series(out, index=values.index, name=values.name)
 
 def parse_staroddi_dat(file):
     lines = file.read().decode("latin1").splitlines()
@@ -15,31 +150,36 @@ def parse_staroddi_dat(file):
         na_values="____",
         decimal=",",
     )
-    df["datetime"] = df["datetime"].str.replace(",", ".", regex=False)
     for col in ["temp", "press", "tilt_x", "tilt_y", "tilt_z", "EAL", "roll"]:
         df[col] = df[col].astype(str).str.replace(",", ".", regex=False)
         df[col] = pd.to_numeric(df[col], errors="coerce")
-    df["datetime"] = pd.to_datetime(df["datetime"], format="%d.%m.%Y %H:%M:%S.%f", errors="coerce")
+    df["datetime"] = decode_staroddi_times(df["datetime"])
     return df
 
 def get_time_range(df):
     return df["datetime"].min(), df["datetime"].max()
 
+BOTTOM_FRACTION = 0.95
+
+def bottom_mask(press):
+    # On bottom: within 5% of the deepest pressure of the cast
+    return press >= BOTTOM_FRACTION * press.max()
+
 def parse_winch_dat(file_path, meta):
     colnames = meta["columns"]
     delimiter = meta["delimiter"]
     header_lines = meta["header_lines"]
-    df = pd.read_csv(
-        os.path.join(meta["file_path"], meta["file_name"]),
-        delimiter=delimiter,
-        skiprows=header_lines,
-        names=colnames,
-        header=None,
-        na_values="____"
-    )
-    df["datetime"] = pd.to_datetime(df[['year', 'month', 'day', 'hour', 'minute', 'second']])
+    path = os.path.join(meta["file_path"], meta["file_name"])
+    df = read_table(lambda: open_raw(path), delimiter, header_lines, colnames, meta.get("parser", "auto"))
+    df["datetime"] = datetime_from_code(df, meta.get("datetime_code"))
     return df
 
+def datetime_from_code(df, datetime_code=None):
+    # Winch settings carry the user's datetime expression in terms of `df`
+    if not datetime_code:
+        return pd.to_datetime(df[['year', 'month', 'day', 'hour', 'minute', 'second']])
+    return eval(datetime_code, {"pd": pd}, {"df": df})
+
 def parse_acc_file(file):
     lines = file.read().decode("latin1").splitlines()
     data_start = next(i for i, line in enumerate(lines) if line and line[0].isdigit())
@@ -51,8 +191,7 @@ def parse_acc_file(file):
         header=None,
         na_values="____"
     )
-    df["datetime"] = df["datetime"].astype(str).str.replace(",", ".", regex=False)
-    df["datetime"] = pd.to_datetime(df["datetime"], format="%d.%m.%Y %H:%M:%S.%f", errors="coerce")
+    df["datetime"] = decode_staroddi_times(df["datetime"])
     for col in ["g", "x_acc", "y_acc", "z_acc"]:
         df[col] = df[col].astype(str).str.replace(",", ".", regex=False)
         df[col] = pd.to_numeric(df[col], errors="coerce")
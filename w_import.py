@@ -3,6 +3,31 @@ import json
 import pandas as pd
 import streamlit as st
 import sqlite3
+from utils import COMPRESSIONS, save_raw, open_raw, datetime_from_code
+from catalog import existing_path, registered_file, record_file_stats
+from jobs import submit, job_panel
+from parser_backends import available_backends
+from winch_sniff import head_sample, sniff, read_sample, load_templates, matching_templates, TEMPLATE_DIR
+
+AUTO_TEMPLATE = "Auto-detected"
+SOURCE_MODES = ["Upload file", "Register existing path"]
+DELIMITER_OPTIONS = [
+    ("Comma (,)", ","),
+    ("Tab (\\t)", "\t"),
+    ("Pipe (|)", "|"),
+    ("Space ( )", " "),
+    ("Semicolon (;)", ";"),
+    ("Whitespace (\\s+)", r"\s+")
+]
+
+def apply_settings(settings):
+    # Load detected or template settings into the wizard widgets
+    label = next((label for label, value in DELIMITER_OPTIONS if value == settings["delimiter"]), None)
+    st.session_state.w_header_lines = int(settings["header_lines"] or 0)
+    st.session_state.w_delimiter_label = label or DELIMITER_OPTIONS[0][0]
+    st.session_state.w_custom_delim = "" if label else settings["delimiter"]
+    st.session_state.w_columns = repr(list(settings["columns"] or []))
+    st.session_state.w_datetime_code = settings["datetime_code"] or ""
 
 def w_import():
     SAVE_DIR = "winch_data"
@@ -10,40 +35,86 @@ def w_import():
 
     st.title("Winch File Ingestion")
 
-    uploaded_file = st.file_uploader("Upload Winch File")  # accept any extension
+    # Registering catalogs a file on shared storage where it is; nothing is copied
+    mode = st.radio("Source", SOURCE_MODES, horizontal=True, key="w_mode")
+    uploaded_file = registered_path = None
+    if mode == "Upload file":
+        uploaded_file = st.file_uploader("Upload Winch File")  # accept any extension
+    else:
+        path_input = st.text_input("Path of the file on shared storage", key="w_path")
+        if path_input.strip():
+            try:
+                registered_path = existing_path(path_input)
+            except ValueError as e:
+                st.error(str(e))
     cruise_name = st.text_input("Cruise Name")
+    if mode == "Upload file":
+        compression = st.selectbox("Storage compression", COMPRESSIONS)
+
+    if uploaded_file is not None or registered_path is not None:
+        if uploaded_file is not None:
+            file_name, sample_id = uploaded_file.name, uploaded_file.file_id
+        else:
+            file_name = os.path.basename(registered_path)
+            sample_id = (registered_path, os.path.getmtime(registered_path))
+
+        # Detection and every preview below work on a head sample read once per file;
+        # the whole file is only parsed by the ingest job
+        templates = load_templates()
+        if st.session_state.get("w_sample_id") != sample_id:
+            if uploaded_file is not None:
+                sample = head_sample(uploaded_file)
+            else:
+                with open_raw(registered_path) as fh:
+                    sample = head_sample(fh)
+            detected = sniff(sample)
+            matches = matching_templates(templates, detected)
+            st.session_state.w_sample_id = sample_id
+            st.session_state.w_sample = sample
+            st.session_state.w_detected = detected
+            st.session_state.w_template = matches[0] if matches else AUTO_TEMPLATE
+            apply_settings(templates[matches[0]] if matches else detected)
+        sample = st.session_state.w_sample
+        detected = st.session_state.w_detected
+
+        template_names = [AUTO_TEMPLATE] + list(templates)
+        if st.session_state.w_template not in template_names:
+            st.session_state.w_template = AUTO_TEMPLATE
+        st.selectbox(
+            "Settings template", template_names, key="w_template",
+            on_change=lambda: apply_settings(templates.get(st.session_state.w_template, detected)),
+            help="Auto-detected settings come from the first lines of the file; templates are saved settings of earlier files"
+        )
+        st.caption(f"Detected {detected['n_columns']} column(s), {detected['header_lines']} header line(s) "
+                   f"from the first {len(sample) / 1024:.0f} KB.")
 
-    if uploaded_file is not None:
         # Number of header lines to skip
-        header_lines = st.number_input("Number of header lines to skip", min_value=0, value=0, step=1)
+        header_lines = st.number_input("Number of header lines to skip", min_value=0, step=1, key="w_header_lines")
 
         # Select delimiter
-        delimiter_options = [
-            ("Comma (,)", ","),
-            ("Tab (\\t)", "\t"),
-            ("Pipe (|)", "|"),
-            ("Space ( )", " "),
-            ("Semicolon (;)", ";"),
-            ("Whitespace (\\s+)", r"\s+")
-        ]
-        delimiter_label = st.selectbox("Select Delimiter", [label for label, _ in delimiter_options])
-        delimiter = next(value for label, value in delimiter_options if label == delimiter_label)
+        delimiter_label = st.selectbox("Select Delimiter", [label for label, _ in DELIMITER_OPTIONS], key="w_delimiter_label")
+        delimiter = next(value for label, value in DELIMITER_OPTIONS if label == delimiter_label)
 
         # Custom delimiter
-        custom_delim = st.text_input("Custom delimiter (optional)", "")
+        custom_delim = st.text_input("Custom delimiter (optional)", key="w_custom_delim")
         if custom_delim:
             delimiter = custom_delim
 
+        parser = st.selectbox("Parser backend", ["auto"] + available_backends())
+
         # Preview raw
-        uploaded_file.seek(0)
-        df_preview = pd.read_csv(uploaded_file, delimiter=delimiter, skiprows=header_lines, nrows=20, header=None)
+        try:
+            df_preview = read_sample(sample, delimiter, header_lines, nrows=20)
+        except Exception as e:
+            st.error(f"Cannot split the sample with these settings: {e}")
+            df_preview = pd.DataFrame()
         st.write("Raw Preview (first 20 rows):", df_preview)
 
         # Column renaming
         st.subheader("Rename Columns")
         colnames_input = st.text_area(
             "Enter column names as a Python list (e.g., ['year', 'month', 'day', ...])",
-            value="[]"
+            key="w_columns"
         )
         try:
             colnames = eval(colnames_input)  # Convert string input to a Python list
@@ -63,47 +134,49 @@ def w_import():
         )
         datetime_code = st.text_area(
             "Enter the Python code for creating the datetime column",
-            value="pd.to_datetime(df[['year', 'month', 'day', 'hour', 'minute', 'second']])"
+            key="w_datetime_code"
         )
 
         try:
             if datetime_code.strip():
-                # Read the entire dataset
-                uploaded_file.seek(0)  # Reset file pointer
-                df = pd.read_csv(uploaded_file, delimiter=delimiter, skiprows=header_lines, names=colnames)
-
-                # Validate and execute the user-provided code
-                exec(f"df['datetime'] = {datetime_code}")
-                st.write("Preview with datetime column (first 20 rows):", df.head())
-
-                # Calculate start and end datetimes for the full dataset
-                start_datetime = df['datetime'].min()
-                end_datetime = df['datetime'].max()
-                st.write(f"Start Datetime: {start_datetime}")
-                st.write(f"End Datetime: {end_datetime}")
+                # Validate the code on the sample rows; the full parse runs as a background job
+                df = read_sample(sample, delimiter, header_lines, colnames, parser=parser)
+                df['datetime'] = datetime_from_code(df, datetime_code)
+                n_missing = int(df['datetime'].isna().sum())
+                if n_missing:
+                    st.warning(f"{n_missing} of {len(df)} sample rows got no timestamp.")
+                st.write("Preview with datetime column (first 20 rows):", df.head(20))
+                datetime_ok = True
             else:
-                start_datetime = None
-                end_datetime = None
+                datetime_ok = False
         except Exception as e:
             st.error(f"Error creating datetime column: {e}")
-            start_datetime = None
-            end_datetime = None
+            datetime_ok = False
+
+        save_template = st.checkbox("Save these settings as a template for future imports")
 
         # Save file + metadata
-        if st.button("Ingest File"):
-            file_path = os.path.join(SAVE_DIR, uploaded_file.name)
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
+        if st.button("Ingest File", disabled=not datetime_ok):
+            if uploaded_file is not None:
+                uploaded_file.seek(0)
+                file_path = save_raw(uploaded_file, os.path.join(SAVE_DIR, file_name), compression)
+                file_dir = SAVE_DIR
+            else:
+                file_path = registered_path
+                file_dir = os.path.dirname(registered_path)
+                if registered_file("winch", registered_path) is not None:
+                    st.warning(f"{registered_path} is already registered; adding another catalog entry.")
 
             # Prepare settings as JSON string
             settings = json.dumps({
                 "delimiter": delimiter,
                 "header_lines": header_lines,
                 "columns": colnames,
-                "datetime_code": datetime_code
+                "datetime_code": datetime_code,
+                "parser": parser
             })
 
-            # Insert metadata into winch_data table
+            # Insert metadata into winch_data table; the ingest job fills in the time range
             conn = sqlite3.connect("dredge_remote.db")
             cursor = conn.cursor()
             cursor.execute('''
@@ -111,14 +184,28 @@ def w_import():
                     file_name, file_path, cruise, start_time, end_time, settings
                 ) VALUES (?, ?, ?, ?, ?, ?)
             ''', (
-                uploaded_file.name,
-                SAVE_DIR,
+                file_name,
+                file_dir,
                 cruise_name,
-                str(start_datetime),
-                str(end_datetime),
+                None,
+                None,
                 settings
             ))
+            file_id = cursor.lastrowid
             conn.commit()
+            record_file_stats(conn, "winch", file_id, file_path, in_place=uploaded_file is None)
             conn.close()
 
-            st.success(f"File and metadata saved!\n- {file_path}\n- Database entry created.")
+            if save_template:
+                os.makedirs(TEMPLATE_DIR, exist_ok=True)
+                with open(os.path.join(TEMPLATE_DIR, f"{file_name}.meta.json"), "w") as fh:
+                    json.dump({"file_name": file_name, "file_path": file_dir, "cruise": cruise_name,
+                               **json.loads(settings)}, fh, indent=2)
+
+            job_id = submit("winch_ingest", {"file_id": file_id})
+            if uploaded_file is not None:
+                st.success(f"File saved to {file_path}; ingest job #{job_id} queued.")
+            else:
+                st.success(f"Registered {file_path} in place; ingest job #{job_id} queued.")
+
+    job_panel()
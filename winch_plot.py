@@ -1,9 +1,10 @@
 import os
-import pandas as pd
 import streamlit as st
 import json
 import plotly.express as px
 import datetime
+import io
+from parser_backends import read_table
 
 st.title("Winch Data Parser and Plotter")
 
@@ -26,7 +27,7 @@ if raw_file and meta_file:
 
         # Read the raw file
         raw_file.seek(0)  # Reset file pointer
-        df = pd.read_csv(raw_file, delimiter=delimiter, skiprows=header_lines, names=columns)
+        df = read_table(lambda: io.BytesIO(raw_file.getvalue()), delimiter, header_lines, columns, meta.get("parser", "auto"))
         st.write("Parsed Data Preview:", df.head())
 
         # Clean column names
@@ -0,0 +1,153 @@
+import io
+import os
+import glob
+import json
+import numpy as np
+import pandas as pd
+from parser_backends import read_table
+
+# Format detection for the winch import wizard. Everything here works on a bounded
+# head sample of the upload, never on the whole file.
+
+SAMPLE_BYTES = 64 * 1024
+MAX_SAMPLE_LINES = 200
+TEMPLATE_DIR = "winch"
+CANDIDATE_DELIMITERS = [",", "\t", ";", "|", r"\s+"]  # specific first; ties go to the earlier one
+SETTING_KEYS = ["delimiter", "header_lines", "columns", "datetime_code"]
+YMDHMS = ["year", "month", "day", "hour", "minute", "second"]
+YMDHMS_CODE = "pd.to_datetime(df[['year', 'month', 'day', 'hour', 'minute', 'second']])"
+YMDHMS_RANGES = [(1990, 2100), (1, 12), (1, 31), (0, 23), (0, 59), (0, 61)]
+
+def head_sample(fileobj, n_bytes=SAMPLE_BYTES):
+    # First n_bytes cut back to the last complete line; seekable sources are rewound
+    if fileobj.seekable():
+        fileobj.seek(0)
+    data = fileobj.read(n_bytes)
+    if fileobj.seekable():
+        fileobj.seek(0)
+    if len(data) == n_bytes and b"\n" in data:
+        data = data[:data.rindex(b"\n") + 1]
+    return data
+
+def sample_lines(sample):
+    # Blank lines are kept so indices match the skiprows of the real parse
+    return sample.decode("latin1").splitlines()[:MAX_SAMPLE_LINES]
+
+def split_fields(line, delimiter):
+    return line.split() if delimiter == r"\s+" else line.split(delimiter)
+
+def _is_number(field):
+    try:
+        float(field.strip().replace(",", "."))
+        return True
+    except ValueError:
+        return False
+
+def detect_delimiter(lines):
+    # Delimiter giving the most consistent field count (>1) over the second half of the
+    # sample, then the most fields that read as numbers (so "1,5;2,0" splits on ";" and
+    # tab-separated timestamps with spaces stay whole)
+    best, best_score, best_fields = None, None, 1
+    filled = [line for line in lines if line.strip()]
+    tail = filled[len(filled) // 2:]
+    for delimiter in CANDIDATE_DELIMITERS:
+        rows = [split_fields(line, delimiter) for line in tail]
+        counts = np.array([len(fields) for fields in rows])
+        if not len(counts):
+            continue
+        n_fields = int(np.bincount(counts).argmax())
+        if n_fields < 2:
+            continue
+        numeric = np.mean([_is_number(f) for fields in rows for f in fields])
+        score = (round(float(np.mean(counts == n_fields)), 2), round(float(numeric), 2))
+        if best_score is None or score > best_score:
+            best, best_score, best_fields = delimiter, score, n_fields
+    return best, best_fields
+
+def detect_header(lines, delimiter, n_fields):
+    # Leading lines before the first row that has the data field count and is mostly
+    # numeric; a non-numeric row of the same width just above it supplies column names
+    for i, line in enumerate(lines):
+        fields = split_fields(line, delimiter)
+        if len(fields) == n_fields and sum(map(_is_number, fields)) * 2 >= n_fields:
+            names = None
+            if i > 0:
+                above = [f.strip() for f in split_fields(lines[i - 1], delimiter)]
+                if len(above) == n_fields and not any(map(_is_number, above)) and len(set(above)) == n_fields:
+                    names = above
+            return i, names
+    return 0, None
+
+def read_sample(sample, delimiter, header_lines, columns=None, nrows=None, parser=None):
+    # parser: a parser_backends name, to read the sample the way the ingest job will
+    if parser is not None:
+        df = read_table(lambda: io.BytesIO(sample), delimiter, header_lines, columns, parser)
+        return df.head(nrows) if nrows else df
+    return pd.read_csv(io.BytesIO(sample), delimiter=delimiter, skiprows=header_lines,
+                       names=columns or None, header=None, nrows=nrows)
+
+def detect_datetime(df):
+    # (column names, datetime code) for the timestamp layouts seen in winch logs:
+    # leading year..second integer columns, a date and a time column, or one timestamp column
+    columns = list(df.columns)
+    if len(columns) >= 6:
+        lead = df.iloc[:, :6].apply(pd.to_numeric, errors="coerce")
+        if lead.notna().all().all() and all(lead.iloc[:, i].between(lo, hi).all() for i, (lo, hi) in enumerate(YMDHMS_RANGES)):
+            return YMDHMS + columns[6:], YMDHMS_CODE
+    text = [c for c in columns if not pd.api.types.is_numeric_dtype(df[c])]
+    for first, second in zip(columns, columns[1:]):
+        if first in text and second in text:
+            parsed = pd.to_datetime(df[first].astype(str) + " " + df[second].astype(str), errors="coerce", format="mixed")
+            if parsed.notna().all():
+                return columns, f"pd.to_datetime(df['{first}'].astype(str) + ' ' + df['{second}'].astype(str))"
+    for col in text:
+        parsed = pd.to_datetime(df[col], errors="coerce", format="mixed")
+        if parsed.notna().all():
+            return columns, f"pd.to_datetime(df['{col}'])"
+    return columns, ""
+
+def sniff(sample):
+    # Best guess at the wizard settings for an upload, from its head sample
+    lines = sample_lines(sample)
+    delimiter, n_fields = detect_delimiter(lines)
+    if delimiter is None:
+        return {"delimiter": ",", "header_lines": 0, "columns": [], "datetime_code": "", "n_columns": 1}
+    header_lines, names = detect_header(lines, delimiter, n_fields)
+    columns = names or [f"col_{i}" for i in range(n_fields)]
+    datetime_code = ""
+    try:
+        df = read_sample(sample, delimiter, header_lines, columns, nrows=50)
+        if names is None:
+            columns, datetime_code = detect_datetime(df)
+        else:
+            _, datetime_code = detect_datetime(df)
+    except (ValueError, pd.errors.ParserError):
+        pass
+    return {"delimiter": delimiter, "header_lines": header_lines, "columns": columns,
+            "datetime_code": datetime_code, "n_columns": n_fields}
+
+def load_templates(directory=TEMPLATE_DIR):
+    # Settings of previously ingested files, one per distinct layout; name -> settings
+    templates = {}
+    seen = set()
+    for path in sorted(glob.glob(os.path.join(directory, "*.meta.json"))):
+        try:
+            with open(path) as fh:
+                meta = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        settings = {k: meta.get(k) for k in SETTING_KEYS}
+        if not settings["columns"]:
+            continue
+        layout = json.dumps(settings, sort_keys=True)
+        if layout in seen:
+            continue
+        seen.add(layout)
+        name = meta.get("cruise") or meta.get("file_name") or os.path.basename(path)
+        templates[f"{name} ({len(settings['columns'])} columns)"] = settings
+    return templates
+
+def matching_templates(templates, detected):
+    # Templates whose delimiter and column count agree with the sample
+    return [name for name, settings in templates.items()
+            if settings["delimiter"] == detected["delimiter"] and len(settings["columns"]) == detected["n_columns"]]